@@ -0,0 +1,146 @@
+import abc
+import asyncio
+from collections.abc import Awaitable, Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from functools import partial
+from typing import TypeVar
+
+from rds_encryptor.catalog import CatalogSnapshot
+from rds_encryptor.db_manager import (
+    InvalidCredentialsException,
+    InvalidPostgresCredentialsException,
+    PostgresDBManager,
+    TableEstimate,
+)
+from rds_encryptor.rds.instance import RDSInstance
+
+T = TypeVar("T")
+
+# Executor of the enclosing gather_limited call, the loop's default executor is used outside of one
+_executor: ContextVar[ThreadPoolExecutor | None] = ContextVar("_executor", default=None)
+
+
+async def run_blocking(func: Callable[..., T], *args) -> T:
+    """
+    Runs a blocking call in the executor of the enclosing ``gather_limited``, or the loop's default one.
+    """
+    return await asyncio.get_running_loop().run_in_executor(_executor.get(), partial(func, *args))
+
+
+async def gather_limited(
+    items: Iterable[str],
+    func: Callable[[str], Awaitable[T]],
+    concurrency: int,
+) -> list[T]:
+    """
+    Runs ``func`` for every item at the same time, with at most ``concurrency`` of them in flight.
+    Blocking calls wrapped by ``AsyncPostgresDBManager`` run in an executor of ``concurrency`` threads
+    owned by this call, so they are not throttled by the default thread count.
+
+    When a call fails, the other calls are cancelled and the executor is shut down only once the blocking
+    calls already running returned, so none of them keeps using a pooled connection unsupervised.
+    """
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="async-db")
+    # Tasks copy the context they are created in, so every call of func sees the executor
+    token = _executor.set(executor)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(item: str) -> T:
+        async with semaphore:
+            return await func(item)
+
+    tasks = [asyncio.ensure_future(run(item)) for item in items]
+    try:
+        return await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        _executor.reset(token)
+        # Waits in another thread, so the event loop is not blocked by calls still running
+        await asyncio.to_thread(executor.shutdown, wait=True, cancel_futures=True)
+
+
+class AsyncDBManager(abc.ABC):
+    invalid_credentials_exception: InvalidCredentialsException
+
+    @staticmethod
+    def from_rds(rds_instance: RDSInstance, database: str = "postgres") -> "AsyncPostgresDBManager":
+        return AsyncPostgresDBManager(
+            host=rds_instance.endpoint,
+            port=rds_instance.port,
+            user=rds_instance.master_username,
+            password=rds_instance.master_password,
+            database=database,
+        )
+
+    @abc.abstractmethod
+    async def check_connection(self) -> bool:
+        pass
+
+
+class AsyncPostgresDBManager(AsyncDBManager):
+    """
+    Asyncio interface of ``PostgresDBManager``.
+
+    psycopg2 is blocking, so every call runs with ``run_blocking``. Connections still come from the shared
+    ``PostgresDBManager.pool`` and the catalog snapshot cache is shared with sync managers.
+    """
+
+    invalid_credentials_exception = InvalidPostgresCredentialsException
+
+    def __init__(self, host: str, port: int, user: str, password: str, database: str):
+        self.sync = PostgresDBManager(host=host, port=port, user=user, password=password, database=database)
+
+    @property
+    def database(self) -> str:
+        return self.sync.database
+
+    async def check_connection(self) -> bool:
+        return await run_blocking(self.sync.check_connection)
+
+    async def get_parameter(self, parameter: str) -> str:
+        return await run_blocking(self.sync.get_parameter, parameter)
+
+    async def create_extension(self, extension: str):
+        return await run_blocking(self.sync.create_extension, extension)
+
+    async def get_catalog(self) -> CatalogSnapshot:
+        return await run_blocking(lambda: self.sync.catalog)
+
+    async def get_partitioned_tables(self) -> list[dict[str, str]]:
+        return await run_blocking(self.sync.get_partitioned_tables)
+
+    async def get_all_tables(self) -> list[str]:
+        return await run_blocking(self.sync.get_all_tables)
+
+    async def get_table_estimates(self) -> dict[str, TableEstimate]:
+        return await run_blocking(self.sync.get_table_estimates)
+
+    async def get_write_rate(self, sample_seconds: float = 5) -> float:
+        return await run_blocking(self.sync.get_write_rate, sample_seconds)
+
+    async def create_replication_slot(self, slot_name: str) -> str:
+        return await run_blocking(self.sync.create_replication_slot, slot_name)
+
+    async def drop_replication_slot(self, slot_name: str) -> None:
+        return await run_blocking(self.sync.drop_replication_slot, slot_name)
+
+    async def set_read_only(self, read_only: bool) -> None:
+        return await run_blocking(self.sync.set_read_only, read_only)
+
+    async def terminate_client_backends(self) -> int:
+        return await run_blocking(self.sync.terminate_client_backends)
+
+    async def truncate_database(self, batch_size: int = 1000) -> int:
+        return await run_blocking(self.sync.truncate_database, batch_size)
+
+    async def get_sequences(self) -> list[dict[str, int | str]]:
+        return await run_blocking(self.sync.get_sequences)
+
+    async def set_sequences(self, sequences: list[dict[str, int | str]], margin: int = 0) -> int:
+        return await run_blocking(self.sync.set_sequences, sequences, margin)
+
+    async def count(self, table: str) -> int:
+        return await run_blocking(self.sync.count, table)
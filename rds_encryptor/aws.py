@@ -0,0 +1,182 @@
+import copy
+import json
+import time
+from functools import partial
+from threading import Lock
+
+import boto3
+from botocore.client import BaseClient
+from botocore.config import Config
+
+from rds_encryptor.utils import get_logger
+
+# Enough for the provisioning, polling and telemetry threads calling one service at the same time
+MAX_POOL_CONNECTIONS = 50
+MAX_ATTEMPTS = 10
+
+# Seconds describe results stay fresh, mutating calls through the shared clients drop them earlier
+DESCRIBE_TTLS = {
+    "describe_db_instances": 60,
+    "describe_db_snapshots": 30,
+    "describe_db_parameter_groups": 10 * 60,
+    "describe_db_parameters": 10 * 60,
+    "describe_replication_instances": 60,
+    "describe_endpoints": 60,
+}
+DEFAULT_DESCRIBE_TTL = 30
+READ_OPERATION_PREFIXES = ("Describe", "List", "Get")
+
+
+class AWSClients:
+    """
+    Registry of boto3 clients shared by the whole tool.
+
+    Clients are created from one session on first use instead of at import time, with a connection
+    pool large enough for concurrent callers and adaptive retries, which also rate-limit the client
+    when AWS throttles it. Call ``configure`` before the first client is used to change the region or
+    the limits, and ``set_client`` to replace a client, e.g. with a botocore ``Stubber`` in tests.
+    """
+
+    logger = get_logger("AWSClients")
+
+    _lock = Lock()
+    _session: boto3.session.Session | None = None
+    _clients: dict[str, BaseClient] = {}
+    _region_name: str | None = None
+    _config = Config(
+        max_pool_connections=MAX_POOL_CONNECTIONS, retries={"mode": "adaptive", "max_attempts": MAX_ATTEMPTS}
+    )
+
+    @classmethod
+    def configure(
+        cls,
+        region_name: str | None = None,
+        max_pool_connections: int = MAX_POOL_CONNECTIONS,
+        max_attempts: int = MAX_ATTEMPTS,
+    ) -> None:
+        """
+        Drops clients created so far, the next use creates them with the new settings.
+
+        :param region_name: AWS region, the default of the environment when None
+        :param max_pool_connections: HTTP connections kept per client
+        :param max_attempts: Attempts of a throttled or failed call, including the first one
+        """
+        with cls._lock:
+            cls._session = None
+            cls._clients = {}
+            cls._region_name = region_name
+            cls._config = Config(
+                max_pool_connections=max_pool_connections,
+                retries={"mode": "adaptive", "max_attempts": max_attempts},
+            )
+        DescribeCache.invalidate()
+
+    @classmethod
+    def get(cls, service_name: str) -> BaseClient:
+        client = cls._clients.get(service_name)
+        if client is not None:
+            return client
+        # Sessions are not thread-safe, clients are
+        with cls._lock:
+            client = cls._clients.get(service_name)
+            if client is None:
+                if cls._session is None:
+                    cls._session = boto3.session.Session(region_name=cls._region_name)
+                client = cls._session.client(service_name, config=cls._config)
+                DescribeCache.register(service_name, client)
+                cls._clients[service_name] = client
+                cls.logger.debug('Created "%s" client in "%s" region', service_name, client.meta.region_name)
+            return client
+
+    @classmethod
+    def set_client(cls, service_name: str, client: BaseClient | None) -> None:
+        """
+        Replaces the shared client of the service, None creates a new one on the next use.
+        """
+        with cls._lock:
+            if client is None:
+                cls._clients.pop(service_name, None)
+            else:
+                DescribeCache.register(service_name, client)
+                cls._clients[service_name] = client
+        DescribeCache.invalidate(service_name)
+
+
+class DescribeCache:
+    """
+    TTL cache of describe calls made through the shared clients, keyed by service, operation and parameters.
+
+    Every call other than Describe*, List* and Get* made through a shared client drops the cached results
+    of its service, so changes made by the tool are seen right away. Callers waiting for a resource to
+    change on its own, e.g. to become available, pass ``max_age=0`` to read fresh data.
+    """
+
+    logger = get_logger("DescribeCache")
+
+    _lock = Lock()
+    # (service, operation, parameters) -> (monotonic time the response was fetched, response)
+    _entries: dict[tuple[str, str, str], tuple[float, dict]] = {}
+    # Bumped by every invalidation, a response fetched across one is not cached
+    _generation = 0
+    hits = 0
+    misses = 0
+
+    @classmethod
+    def describe(cls, service_name: str, operation: str, max_age: float | None = None, **params) -> dict:
+        """
+        :param operation: Client method, e.g. "describe_db_instances"
+        :param max_age: Oldest cached response accepted in seconds, the ``DESCRIBE_TTLS`` of the operation by default
+        """
+        if max_age is None:
+            max_age = DESCRIBE_TTLS.get(operation, DEFAULT_DESCRIBE_TTL)
+        key = (service_name, operation, json.dumps(params, sort_keys=True, default=str))
+        with cls._lock:
+            entry = cls._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] <= max_age:
+                cls.hits += 1
+                return copy.deepcopy(entry[1])
+            cls.misses += 1
+            generation = cls._generation
+
+        fetched_at = time.monotonic()
+        response = getattr(AWSClients.get(service_name), operation)(**params)
+        with cls._lock:
+            if generation == cls._generation:
+                cls._entries[key] = (fetched_at, response)
+        # Callers get their own copy, e.g. to extend paginated lists
+        return copy.deepcopy(response)
+
+    @classmethod
+    def invalidate(cls, service_name: str | None = None) -> None:
+        with cls._lock:
+            cls._generation += 1
+            if service_name is None:
+                cls._entries = {}
+            else:
+                cls._entries = {key: entry for key, entry in cls._entries.items() if key[0] != service_name}
+
+    @classmethod
+    def _after_call(cls, service_name: str, model, **_kwargs) -> None:
+        if not model.name.startswith(READ_OPERATION_PREFIXES):
+            cls.invalidate(service_name)
+
+    @classmethod
+    def register(cls, service_name: str, client: BaseClient) -> None:
+        client.meta.events.register("after-call", partial(cls._after_call, service_name))
+
+    @classmethod
+    def log_stats(cls) -> None:
+        cls.logger.info("AWS describe cache stats: %s hits, %s misses", cls.hits, cls.misses)
+
+
+class LazyClient:
+    """
+    Class attribute resolving to the shared client of the service on every access, e.g.
+    ``aws_client = LazyClient("rds")``.
+    """
+
+    def __init__(self, service_name: str):
+        self.service_name = service_name
+
+    def __get__(self, instance: object, owner: type) -> BaseClient:
+        return AWSClients.get(self.service_name)
@@ -0,0 +1,219 @@
+import json
+import re
+from collections import defaultdict
+from collections.abc import Callable, Hashable
+from threading import Lock
+from typing import Literal, NamedTuple
+
+import psycopg2
+
+# Replicated by DMS like any other table to measure replication lag, but not verified. Every task migrating
+# a shard of a database replicates the heartbeat table of its shard index, so each replication stream is measured.
+HEARTBEAT_TABLE = "public.rds_encryptor_heartbeat"
+# Matches names of the heartbeat tables of every shard, in Python and PostgreSQL
+HEARTBEAT_TABLE_REGEX = r"^public\.rds_encryptor_heartbeat(_[0-9]+)?$"
+
+
+def get_heartbeat_table(shard_index: int) -> str:
+    return HEARTBEAT_TABLE if shard_index == 0 else f"{HEARTBEAT_TABLE}_{shard_index}"
+
+
+CATALOG_QUERY = """
+WITH tables AS (
+    SELECT
+        c.oid,
+        n.nspname,
+        c.relname,
+        c.relkind,
+        pg_total_relation_size(c.oid) AS size_bytes,
+        c.reltuples::bigint AS reltuples
+    FROM pg_catalog.pg_class c
+    JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+    WHERE c.relkind IN ('r', 'p')
+      AND ((n.nspname NOT LIKE 'pg_%' AND n.nspname != 'information_schema') OR n.nspname = 'pglogical')
+)
+SELECT json_build_object(
+    'tables', COALESCE((
+        SELECT json_agg(json_build_array(
+            t.nspname,
+            t.relname,
+            t.relkind,
+            parent.name,
+            t.size_bytes,
+            t.reltuples,
+            COALESCE(pk.columns, '{}'),
+            COALESCE(lob.columns, '{}')
+        ) ORDER BY t.nspname, t.relname)
+        FROM tables t
+        LEFT JOIN LATERAL (
+            SELECT json_build_array(pn.nspname, p.relname) AS name
+            FROM pg_catalog.pg_inherits i
+            JOIN pg_catalog.pg_class p ON p.oid = i.inhparent
+            JOIN pg_catalog.pg_namespace pn ON pn.oid = p.relnamespace
+            WHERE i.inhrelid = t.oid AND p.relkind = 'p'
+        ) parent ON TRUE
+        LEFT JOIN LATERAL (
+            SELECT array_agg(a.attname::text ORDER BY k.ord) AS columns
+            FROM pg_catalog.pg_index ix
+            CROSS JOIN LATERAL unnest(ix.indkey) WITH ORDINALITY AS k(attnum, ord)
+            JOIN pg_catalog.pg_attribute a ON a.attrelid = ix.indrelid AND a.attnum = k.attnum
+            WHERE ix.indrelid = t.oid AND ix.indisprimary
+        ) pk ON TRUE
+        LEFT JOIN LATERAL (
+            SELECT array_agg(a.attname::text ORDER BY a.attnum) AS columns
+            FROM pg_catalog.pg_attribute a
+            WHERE a.attrelid = t.oid
+              AND a.attnum > 0
+              AND NOT a.attisdropped
+              AND (
+                  a.atttypid IN ('text'::regtype, 'bytea'::regtype, 'json'::regtype, 'jsonb'::regtype, 'xml'::regtype)
+                  -- varchar without length limit is migrated as LOB too
+                  OR (a.atttypid = 'varchar'::regtype AND a.atttypmod = -1)
+              )
+        ) lob ON TRUE
+    ), '[]'),
+    'sequences', COALESCE((
+        SELECT json_agg(json_build_array(schemaname, sequencename) ORDER BY schemaname, sequencename)
+        FROM pg_catalog.pg_sequences
+    ), '[]')
+);
+"""
+
+
+class CatalogTable(NamedTuple):
+    schema: str
+    name: str
+    kind: Literal["r", "p"]
+    parent: str | None
+    size_bytes: int
+    estimated_rows: int
+    primary_key: tuple[str, ...]
+    lob_columns: tuple[str, ...]
+
+    @property
+    def qualified_name(self) -> str:
+        return f"{self.schema}.{self.name}"
+
+    @property
+    def is_partitioned(self) -> bool:
+        return self.kind == "p"
+
+    @property
+    def is_dms_control_table(self) -> bool:
+        return self.name.startswith("awsdms_ddl_audit")
+
+    @property
+    def is_pglogical_table(self) -> bool:
+        # Truncated with the database, but neither migrated nor verified
+        return self.schema == "pglogical"
+
+    @property
+    def is_heartbeat_table(self) -> bool:
+        return re.match(HEARTBEAT_TABLE_REGEX, self.qualified_name) is not None
+
+
+class CatalogSequence(NamedTuple):
+    schema: str
+    name: str
+
+
+class CatalogSnapshot:
+    """
+    Tables, partition hierarchy, sequences, sizes, primary keys and LOB columns of one database,
+    loaded with a single introspection query.
+
+    Snapshots are cached per (instance, database) for the whole run. Call ``invalidate`` after DDL
+    (or any change that matters to the cached sizes) so the next ``cached`` call reloads the catalog.
+    """
+
+    _cache: dict[Hashable, "CatalogSnapshot"] = {}
+    _cache_lock = Lock()
+
+    def __init__(self, tables: list[CatalogTable], sequences: list[CatalogSequence]):
+        self.tables = {table.qualified_name: table for table in tables}
+        self.sequences = sequences
+        self._children: dict[str, list[CatalogTable]] = defaultdict(list)
+        for table in tables:
+            if table.parent:
+                self._children[table.parent].append(table)
+
+    @classmethod
+    def load(cls, cursor: psycopg2.extensions.cursor) -> "CatalogSnapshot":
+        cursor.execute(CATALOG_QUERY)
+        catalog = cursor.fetchone()[0]
+        if isinstance(catalog, str):
+            catalog = json.loads(catalog)
+        return cls(
+            tables=[
+                CatalogTable(
+                    schema=schema,
+                    name=name,
+                    kind=kind,
+                    parent=".".join(parent) if parent else None,
+                    size_bytes=size_bytes or 0,
+                    estimated_rows=estimated_rows,
+                    primary_key=tuple(primary_key),
+                    lob_columns=tuple(lob_columns),
+                )
+                for schema, name, kind, parent, size_bytes, estimated_rows, primary_key, lob_columns in catalog[
+                    "tables"
+                ]
+            ],
+            sequences=[CatalogSequence(schema=schema, name=name) for schema, name in catalog["sequences"]],
+        )
+
+    @classmethod
+    def cached(cls, key: Hashable, loader: Callable[[], "CatalogSnapshot"]) -> "CatalogSnapshot":
+        with cls._cache_lock:
+            snapshot = cls._cache.get(key)
+        if snapshot is None:
+            snapshot = loader()
+            with cls._cache_lock:
+                cls._cache[key] = snapshot
+        return snapshot
+
+    @classmethod
+    def invalidate(cls, key: Hashable | None = None) -> None:
+        with cls._cache_lock:
+            if key is None:
+                cls._cache.clear()
+            else:
+                cls._cache.pop(key, None)
+
+    @property
+    def user_tables(self) -> list[CatalogTable]:
+        """Tables to migrate and verify, without DMS control, pglogical and heartbeat tables."""
+        return [
+            table
+            for table in self.tables.values()
+            if not table.is_dms_control_table and not table.is_pglogical_table and not table.is_heartbeat_table
+        ]
+
+    @property
+    def partition_parents(self) -> list[CatalogTable]:
+        return [
+            table for table in self.tables.values() if table.is_partitioned and self._children[table.qualified_name]
+        ]
+
+    def partitions(self, parent: str) -> list[CatalogTable]:
+        return self._children.get(parent, [])
+
+    def total_size(self, table: str) -> int:
+        """Size of the table, or of all its leaf partitions for partitioned tables."""
+        catalog_table = self.tables[table]
+        if not catalog_table.is_partitioned:
+            return catalog_table.size_bytes
+        return sum(leaf.size_bytes for leaf in self.leaf_partitions(table))
+
+    def leaf_partitions(self, parent: str) -> list[CatalogTable]:
+        leaves = []
+        for partition in self.partitions(parent):
+            if partition.is_partitioned:
+                leaves.extend(self.leaf_partitions(partition.qualified_name))
+            else:
+                leaves.append(partition)
+        return leaves
+
+    @property
+    def primary_keys(self) -> dict[str, list[str]]:
+        return {name: list(table.primary_key) for name, table in self.tables.items() if table.primary_key}
@@ -1,5 +1,6 @@
 import argparse
 
+from rds_encryptor.aws import MAX_POOL_CONNECTIONS, AWSClients
 from rds_encryptor.encryption_pipeline import EncryptionPipeline
 
 
@@ -42,7 +43,138 @@ def main():
         required=False,
         help="Identifier for the new encrypted RDS instance",
     )
+    parser.add_argument(
+        "--consistency-check-workers",
+        type=int,
+        default=8,
+        help="Number of parallel row count queries used to check data consistency",
+    )
+    parser.add_argument(
+        "--consistency-tolerance",
+        type=float,
+        default=0.0,
+        help="Allowed relative difference between source and target row estimates before rows are counted exactly",
+    )
+    parser.add_argument(
+        "--exact-consistency-check",
+        action="store_true",
+        help="Always count rows exactly instead of trusting matching row estimates",
+    )
+    parser.add_argument(
+        "--content-verification",
+        action="store_true",
+        help="Compare table contents by chunked primary key hashes instead of DMS row-level validation",
+    )
+    parser.add_argument(
+        "--content-verification-progress",
+        type=str,
+        required=False,
+        help="File used to save and resume content verification progress",
+    )
+    parser.add_argument(
+        "--sequence-margin",
+        type=int,
+        default=0,
+        help="Safety margin added to every sequence value copied to the encrypted instance",
+    )
+    parser.add_argument(
+        "--db-concurrency",
+        type=int,
+        default=8,
+        help="Maximum number of databases processed at the same time",
+    )
+    parser.add_argument(
+        "--max-concurrent-tasks",
+        type=int,
+        required=False,
+        help="Maximum number of running DMS tasks, derived from the replication instance class by default",
+    )
+    parser.add_argument(
+        "--table-recovery",
+        action="store_true",
+        help="Reload failed, suspended and mismatched tables in the running DMS tasks",
+    )
+    parser.add_argument(
+        "--telemetry-path",
+        type=str,
+        required=False,
+        help="JSON lines file to append per-table DMS load rates and time remaining to, only logged by default",
+    )
+    parser.add_argument(
+        "--telemetry-interval",
+        type=int,
+        default=60,
+        help="Seconds between two DMS table statistics samples",
+    )
+    parser.add_argument(
+        "--max-replication-lag",
+        type=float,
+        required=False,
+        help="Measure replication lag with a heartbeat table and wait until it is below this many seconds",
+    )
+    parser.add_argument(
+        "--replication-lag-stable-seconds",
+        type=float,
+        default=60,
+        help="How long replication lag has to stay below --max-replication-lag",
+    )
+    parser.add_argument(
+        "--cutover",
+        action="store_true",
+        help="Block writes on the source once replication caught up, then sync sequences and verify the target",
+    )
+    parser.add_argument(
+        "--cutover-switch-endpoints",
+        action="store_true",
+        help="Rename the instances after cutover so the encrypted instance takes over the source endpoint",
+    )
+    parser.add_argument(
+        "--cdc-from-snapshot",
+        action="store_true",
+        help="Keep the data restored from the snapshot and only replicate changes from a slot created before it",
+    )
+    parser.add_argument(
+        "--lob-profiling",
+        action="store_true",
+        help="Measure LOB column sizes on the source to pick the smallest safe LOB size per task and table",
+    )
+    parser.add_argument(
+        "--parallel-load",
+        action="store_true",
+        help="Split large tables and partitions into primary key ranges loaded by several DMS threads",
+    )
+    parser.add_argument(
+        "--parallel-load-segment-gb",
+        type=float,
+        default=5,
+        help="Approximate size of one --parallel-load segment in GiB",
+    )
+    parser.add_argument(
+        "--max-tasks-per-database",
+        type=int,
+        default=1,
+        help="Split large databases into up to this many DMS tasks balanced by table size",
+    )
+    parser.add_argument(
+        "--shard-size-gb",
+        type=float,
+        default=100,
+        help="Data per DMS task in GiB when --max-tasks-per-database is above 1, larger tables get their own task",
+    )
+    parser.add_argument(
+        "--aws-region",
+        type=str,
+        default=None,
+        help="AWS region of the RDS instance and DMS resources, the environment default when not set",
+    )
+    parser.add_argument(
+        "--aws-max-pool-connections",
+        type=int,
+        default=MAX_POOL_CONNECTIONS,
+        help="HTTP connections kept per AWS client",
+    )
     args = parser.parse_args()
+    AWSClients.configure(region_name=args.aws_region, max_pool_connections=args.aws_max_pool_connections)
     pipeline = EncryptionPipeline(
         instance_id=args.rds_instance_name,
         master_password=args.master_password,
@@ -50,6 +182,27 @@ def main():
         dms_replication_instance_arn=args.dms_replication_instance_arn,
         databases=args.databases,
         new_instance_identifier=args.new_instance_identifier,
+        consistency_check_workers=args.consistency_check_workers,
+        consistency_tolerance=args.consistency_tolerance,
+        exact_consistency_check=args.exact_consistency_check,
+        content_verification=args.content_verification,
+        content_verification_progress_path=args.content_verification_progress,
+        sequence_margin=args.sequence_margin,
+        db_concurrency=args.db_concurrency,
+        max_concurrent_tasks=args.max_concurrent_tasks,
+        table_recovery=args.table_recovery,
+        telemetry_path=args.telemetry_path,
+        telemetry_interval=args.telemetry_interval,
+        max_replication_lag=args.max_replication_lag,
+        replication_lag_stable_seconds=args.replication_lag_stable_seconds,
+        cutover=args.cutover,
+        cutover_switch_endpoints=args.cutover_switch_endpoints,
+        cdc_from_snapshot=args.cdc_from_snapshot,
+        lob_profiling=args.lob_profiling,
+        parallel_load=args.parallel_load,
+        parallel_load_segment_gb=args.parallel_load_segment_gb,
+        max_tasks_per_database=args.max_tasks_per_database,
+        shard_size_gb=args.shard_size_gb,
     )
     pipeline.run_pipeline()
 
@@ -0,0 +1,223 @@
+import time
+from collections import defaultdict
+from collections.abc import Generator
+from contextlib import contextmanager
+from threading import Condition
+from typing import NamedTuple
+
+import psycopg2
+
+from rds_encryptor.utils import get_logger
+
+# Reported in pg_stat_activity, so our own sessions survive when client backends are terminated during cutover
+APPLICATION_NAME = "rds-encryptor"
+
+
+class PoolKey(NamedTuple):
+    host: str
+    port: int
+    database: str
+    user: str
+
+
+class PoolExhaustedException(Exception):
+    pass
+
+
+class PoolStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.connect_seconds = 0.0
+        self.health_check_failures = 0
+        self.evictions = 0
+
+    @property
+    def avg_connect_seconds(self) -> float:
+        return self.connect_seconds / self.misses if self.misses else 0.0
+
+    @property
+    def saved_seconds(self) -> float:
+        """Estimated time saved by reusing connections instead of opening new ones."""
+        return self.hits * self.avg_connect_seconds
+
+    def as_dict(self) -> dict[str, int | float]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "connect_seconds": round(self.connect_seconds, 3),
+            "avg_connect_seconds": round(self.avg_connect_seconds, 3),
+            "saved_seconds": round(self.saved_seconds, 3),
+            "health_check_failures": self.health_check_failures,
+            "evictions": self.evictions,
+        }
+
+
+class _IdleConnection(NamedTuple):
+    connection: psycopg2.extensions.connection
+    released_at: float
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of psycopg2 connections shared by every DB manager.
+
+    Connections are grouped by (host, port, database, user). Each group holds at most ``max_size``
+    connections (idle + borrowed), idle connections older than ``max_idle_time`` seconds are closed,
+    and connections idle for more than ``health_check_after`` seconds are pinged before being handed out.
+    """
+
+    logger = get_logger("ConnectionPool")
+
+    def __init__(
+        self,
+        max_size: int = 8,
+        max_idle_time: float = 5 * 60,
+        health_check_after: float = 30,
+        acquire_timeout: float = 5 * 60,
+    ):
+        self.max_size = max_size
+        self.max_idle_time = max_idle_time
+        self.health_check_after = health_check_after
+        self.acquire_timeout = acquire_timeout
+        self.stats = PoolStats()
+        self._idle: dict[PoolKey, list[_IdleConnection]] = defaultdict(list)
+        self._borrowed: dict[PoolKey, int] = defaultdict(int)
+        self._condition = Condition()
+
+    def _size(self, key: PoolKey) -> int:
+        return len(self._idle[key]) + self._borrowed[key]
+
+    def _evict_idle(self) -> None:
+        now = time.monotonic()
+        evicted = 0
+        for idle in self._idle.values():
+            expired = [item for item in idle if now - item.released_at > self.max_idle_time]
+            for item in expired:
+                idle.remove(item)
+                item.connection.close()
+                evicted += 1
+        if evicted:
+            self.stats.evictions += evicted
+            self._condition.notify_all()
+
+    def _is_healthy(self, item: _IdleConnection) -> bool:
+        connection = item.connection
+        if connection.closed:
+            return False
+        if connection.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            return False
+        if time.monotonic() - item.released_at < self.health_check_after:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            connection.rollback()
+        except psycopg2.Error:
+            return False
+        return True
+
+    def _connect(self, key: PoolKey, password: str) -> psycopg2.extensions.connection:
+        started_at = time.monotonic()
+        connection = psycopg2.connect(
+            host=key.host,
+            port=key.port,
+            user=key.user,
+            password=password,
+            database=key.database,
+            application_name=APPLICATION_NAME,
+        )
+        elapsed = time.monotonic() - started_at
+        with self._condition:
+            self.stats.connect_seconds += elapsed
+        self.logger.debug('Opened connection to "%s" database on "%s" in %.3fs', key.database, key.host, elapsed)
+        return connection
+
+    def _reserve(self, key: PoolKey, deadline: float) -> _IdleConnection | None:
+        """
+        Borrows an idle connection of the group, or a slot for a new connection when None is returned.
+        """
+        with self._condition:
+            self._evict_idle()
+            while True:
+                idle = self._idle[key]
+                if idle:
+                    self._borrowed[key] += 1
+                    return idle.pop()
+                if self._size(key) < self.max_size:
+                    self._borrowed[key] += 1
+                    self.stats.misses += 1
+                    return None
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._condition.wait(timeout=remaining):
+                    raise PoolExhaustedException(
+                        f"No free connection to {key.database} database on {key.host} after {self.acquire_timeout}s"
+                    )
+
+    def acquire(self, key: PoolKey, password: str) -> psycopg2.extensions.connection:
+        deadline = time.monotonic() + self.acquire_timeout
+        while (item := self._reserve(key, deadline)) is not None:
+            # The health check can wait for the network, so it runs without the lock
+            if self._is_healthy(item):
+                with self._condition:
+                    self.stats.hits += 1
+                return item.connection
+            item.connection.close()
+            with self._condition:
+                self._borrowed[key] -= 1
+                self.stats.health_check_failures += 1
+                self._condition.notify_all()
+
+        try:
+            return self._connect(key, password)
+        except Exception:
+            with self._condition:
+                self._borrowed[key] -= 1
+                self._condition.notify_all()
+            raise
+
+    def release(self, key: PoolKey, connection: psycopg2.extensions.connection, discard: bool = False) -> None:
+        if not connection.closed and not discard:
+            try:
+                connection.rollback()
+            except psycopg2.Error:
+                discard = True
+        with self._condition:
+            self._borrowed[key] -= 1
+            if discard or connection.closed:
+                connection.close()
+            else:
+                self._idle[key].append(_IdleConnection(connection=connection, released_at=time.monotonic()))
+            self._condition.notify_all()
+
+    @contextmanager
+    def connection(self, key: PoolKey, password: str) -> Generator[psycopg2.extensions.connection, None, None]:
+        connection = self.acquire(key, password)
+        discard = False
+        try:
+            yield connection
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            discard = True
+            raise
+        finally:
+            self.release(key, connection, discard=discard)
+
+    def ensure_size(self, max_size: int) -> None:
+        """
+        Raises ``max_size`` to at least the given size, e.g. to the number of workers sharing one group.
+        """
+        with self._condition:
+            if max_size > self.max_size:
+                self.max_size = max_size
+                self._condition.notify_all()
+
+    def close_all(self) -> None:
+        with self._condition:
+            for idle in self._idle.values():
+                for item in idle:
+                    item.connection.close()
+            self._idle.clear()
+            self._condition.notify_all()
+
+    def log_stats(self) -> None:
+        self.logger.info("Connection pool stats: %s", self.stats.as_dict())
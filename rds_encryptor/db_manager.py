@@ -1,9 +1,16 @@
 import abc
+import time
 from collections.abc import Generator
+from contextlib import contextmanager
+from typing import NamedTuple
 
 import psycopg2
+from psycopg2 import errors, sql
 
+from rds_encryptor.catalog import HEARTBEAT_TABLE_REGEX, CatalogSnapshot
+from rds_encryptor.connection_pool import APPLICATION_NAME, ConnectionPool, PoolKey
 from rds_encryptor.rds.instance import RDSInstance
+from rds_encryptor.utils import get_logger
 
 
 class InvalidCredentialsException(Exception):
@@ -14,6 +21,49 @@ class InvalidPostgresCredentialsException(InvalidCredentialsException):
     pass
 
 
+class ColumnSize(NamedTuple):
+    column: str
+    max_bytes: int
+
+
+class TableEstimate(NamedTuple):
+    reltuples: int | None
+    live_tuples: int | None
+    size_bytes: int
+
+    @property
+    def rows(self) -> int | None:
+        if self.live_tuples is not None:
+            return self.live_tuples
+        if self.reltuples is not None and self.reltuples >= 0:
+            return self.reltuples
+        return None
+
+
+def table_identifier(table: str) -> sql.Identifier:
+    """Quotes ``schema.table`` names returned by ``get_all_tables``."""
+    return sql.Identifier(*table.split(".", 1))
+
+
+def key_range_condition(
+    key_columns: list[str],
+    lower: list | None,
+    upper: list | None,
+) -> tuple[sql.Composable, list]:
+    """
+    Builds ``(key) > lower AND (key) <= upper`` over a (possibly composite) key, ``None`` bounds are open.
+    """
+    key = sql.SQL("({})").format(sql.SQL(", ").join(map(sql.Identifier, key_columns)))
+    conditions, params = [sql.SQL("TRUE")], []
+    if lower is not None:
+        conditions.append(sql.SQL("{} > ({})").format(key, sql.SQL(", ").join([sql.Placeholder()] * len(lower))))
+        params.extend(lower)
+    if upper is not None:
+        conditions.append(sql.SQL("{} <= ({})").format(key, sql.SQL(", ").join([sql.Placeholder()] * len(upper))))
+        params.extend(upper)
+    return sql.SQL(" AND ").join(conditions), params
+
+
 class DBManager(abc.ABC):
     invalid_credentials_exception: InvalidCredentialsException
 
@@ -33,7 +83,9 @@ class DBManager(abc.ABC):
 
 
 class PostgresDBManager:
+    logger = get_logger("PostgresDBManager")
     invalid_credentials_exception = InvalidPostgresCredentialsException
+    pool = ConnectionPool()
 
     def __init__(self, host: str, port: int, user: str, password: str, database: str):
         self.host = host
@@ -42,135 +94,434 @@ class PostgresDBManager:
         self.password = password
         self.database = database
 
-    def __get_connection(self) -> psycopg2.extensions.connection:
-        return psycopg2.connect(
-            host=self.host,
-            port=self.port,
-            user=self.user,
-            password=self.password,
-            database=self.database,
-        )
+    @property
+    def pool_key(self) -> PoolKey:
+        return PoolKey(host=self.host, port=self.port, database=self.database, user=self.user)
+
+    @contextmanager
+    def _connection(self) -> Generator[psycopg2.extensions.connection, None, None]:
+        with self.pool.connection(self.pool_key, self.password) as conn:
+            yield conn
+
+    @property
+    def catalog(self) -> CatalogSnapshot:
+        return CatalogSnapshot.cached(self.pool_key, self._load_catalog)
+
+    def _load_catalog(self) -> CatalogSnapshot:
+        with self._connection() as conn, conn.cursor() as cursor:
+            return CatalogSnapshot.load(cursor)
+
+    def invalidate_catalog(self) -> None:
+        """Must be called after DDL, so the next ``catalog`` access reloads the snapshot."""
+        CatalogSnapshot.invalidate(self.pool_key)
 
     def check_connection(self) -> bool:
         try:
-            conn = self.__get_connection()
-            cursor = conn.cursor()
-            cursor.execute("SELECT 1")
-            cursor.close()
-            conn.close()
+            with self._connection() as conn, conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
         except psycopg2.DatabaseError:
             return False
         return True
 
     def get_parameter(self, parameter: str) -> str:
-        conn = self.__get_connection()
-        cursor = conn.cursor()
-        cursor.execute(f"SHOW {parameter}")
-        result = cursor.fetchone()[0]
-        cursor.close()
-        conn.close()
-        return result
+        with self._connection() as conn, conn.cursor() as cursor:
+            cursor.execute(f"SHOW {parameter}")
+            return cursor.fetchone()[0]
 
     def create_extension(self, extension: str):
-        conn = self.__get_connection()
-        cursor = conn.cursor()
-        cursor.execute(f"CREATE EXTENSION IF NOT EXISTS {extension}")
-        conn.commit()
-        cursor.close()
-        conn.close()
+        with self._connection() as conn, conn.cursor() as cursor:
+            cursor.execute(f"CREATE EXTENSION IF NOT EXISTS {extension}")
+            conn.commit()
+        self.invalidate_catalog()
 
     def get_partitioned_tables(self) -> list[dict[str, str]]:
-        query = """
-        select relnamespace::regnamespace::text schema_name, oid::regclass::text table_name from pg_class
-        where relkind = 'p' and oid in (select distinct inhparent from pg_inherits)
-        order by schema_name, table_name;
+        return [{"schema": table.schema, "table": table.name} for table in self.catalog.partition_parents]
+
+    def get_all_tables(self) -> list[str]:
+        return [table.qualified_name for table in self.catalog.user_tables]
+
+    def get_table_estimates(self) -> dict[str, TableEstimate]:
         """
-        conn = self.__get_connection()
-        cursor = conn.cursor()
-        cursor.execute(query)
-        tables = [
-            {
-                "schema": row[0],
-                "table": row[1].replace(f"{row[0]}.", "") if row[1].startswith(f"{row[0]}.") else row[1],
+        Reads planner and statistics collector row estimates for every table in one catalog query.
+        Partitioned tables report the sum of their leaf partitions.
+        """
+        with self._connection() as conn, conn.cursor() as cursor:
+            cursor.execute(
+                """
+                WITH relations AS (
+                    SELECT c.oid, n.nspname, c.relname, c.relkind, c.reltuples, s.n_live_tup
+                    FROM pg_catalog.pg_class c
+                    JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+                    LEFT JOIN pg_catalog.pg_stat_user_tables s ON s.relid = c.oid
+                    WHERE c.relkind IN ('r', 'p')
+                      AND n.nspname NOT LIKE 'pg_%%'
+                      AND n.nspname != 'information_schema'
+                      AND c.relname NOT LIKE 'awsdms_ddl_audit%%'
+                      AND n.nspname || '.' || c.relname !~ %s
+                )
+                SELECT r.nspname, r.relname, leaves.reltuples, leaves.n_live_tup, leaves.size_bytes
+                FROM relations r
+                CROSS JOIN LATERAL (
+                    SELECT
+                        CASE WHEN bool_or(l.reltuples < 0) THEN NULL ELSE sum(l.reltuples)::bigint END AS reltuples,
+                        CASE WHEN bool_or(l.n_live_tup IS NULL) THEN NULL ELSE sum(l.n_live_tup)::bigint END
+                            AS n_live_tup,
+                        sum(pg_total_relation_size(l.oid))::bigint AS size_bytes
+                    FROM relations l
+                    WHERE (r.relkind = 'r' AND l.oid = r.oid)
+                       OR (r.relkind = 'p' AND l.oid IN (
+                            SELECT relid FROM pg_partition_tree(r.oid::regclass) WHERE isleaf
+                       ))
+                ) leaves
+                ORDER BY r.nspname, r.relname;
+                """,
+                (HEARTBEAT_TABLE_REGEX,),
+            )
+            return {
+                f"{row[0]}.{row[1]}": TableEstimate(reltuples=row[2], live_tuples=row[3], size_bytes=row[4] or 0)
+                for row in cursor.fetchall()
             }
-            for row in cursor.fetchall()
-        ]
-        cursor.close()
-        conn.close()
-        return tables
 
-    def get_all_tables(self) -> list[str]:
-        conn = self.__get_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            """
-            SELECT schemaname, tablename
-            FROM pg_catalog.pg_tables
-            WHERE schemaname NOT LIKE 'pg_%'
-              AND schemaname != 'information_schema'
-              and tablename not like 'awsdms_ddl_audit%'
-            ORDER BY schemaname, tablename;
-            """
+    def _get_modified_rows(self) -> int:
+        with self._connection() as conn, conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT tup_inserted + tup_updated + tup_deleted FROM pg_catalog.pg_stat_database "
+                "WHERE datname = current_database()"
+            )
+            return cursor.fetchone()[0]
+
+    def get_write_rate(self, sample_seconds: float = 5) -> float:
+        """
+        :param sample_seconds: How long to sample the statistics collector for
+        :return: Rows inserted, updated or deleted per second in the database
+        """
+        # Each read runs in its own transaction, statistics are frozen for the duration of a transaction
+        before = self._get_modified_rows()
+        started_at = time.monotonic()
+        time.sleep(sample_seconds)
+        after = self._get_modified_rows()
+        return max(after - before, 0) / (time.monotonic() - started_at)
+
+    def create_heartbeat_tables(self, tables: list[str]) -> None:
+        with self._connection() as conn, conn.cursor() as cursor:
+            for table in tables:
+                cursor.execute(
+                    sql.SQL(
+                        "CREATE TABLE IF NOT EXISTS {} (seq bigint PRIMARY KEY, written_at timestamptz NOT NULL)"
+                    ).format(table_identifier(table))
+                )
+            conn.commit()
+        self.invalidate_catalog()
+
+    def drop_heartbeat_tables(self, tables: list[str]) -> None:
+        with self._connection() as conn, conn.cursor() as cursor:
+            # The source database is read-only after cutover
+            cursor.execute("SET TRANSACTION READ WRITE")
+            cursor.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(sql.SQL(", ").join(map(table_identifier, tables))))
+            conn.commit()
+        self.invalidate_catalog()
+
+    def write_heartbeat(self, seq: int, tables: list[str]) -> None:
+        with self._connection() as conn, conn.cursor() as cursor:
+            # Heartbeats keep flowing while writes are blocked during cutover
+            cursor.execute("SET TRANSACTION READ WRITE")
+            for table in tables:
+                cursor.execute(
+                    sql.SQL("INSERT INTO {} (seq, written_at) VALUES (%s, now())").format(table_identifier(table)),
+                    (seq,),
+                )
+            conn.commit()
+
+    def read_heartbeat(self, tables: list[str]) -> int | None:
+        """
+        :return: Latest heartbeat sequence number every table has, None if a table was not replicated yet
+        """
+        query = sql.SQL("SELECT {}").format(
+            sql.SQL(", ").join(sql.SQL("(SELECT max(seq) FROM {})").format(table_identifier(table)) for table in tables)
+        )
+        with self._connection() as conn, conn.cursor() as cursor:
+            try:
+                cursor.execute(query)
+            except errors.UndefinedTable:
+                return None
+            latest = cursor.fetchone()
+            return None if None in latest else min(latest)
+
+    def create_replication_slot(self, slot_name: str) -> str:
+        """
+        Creates a logical replication slot with the test_decoding plugin, or reuses the existing one.
+
+        :return: LSN from which the slot retains changes
+        """
+        with self._connection() as conn, conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT confirmed_flush_lsn::text FROM pg_catalog.pg_replication_slots WHERE slot_name = %s",
+                (slot_name,),
+            )
+            row = cursor.fetchone()
+            if row is not None:
+                self.logger.info('Replication slot "%s" already exists at %s', slot_name, row[0])
+                return row[0]
+            cursor.execute(
+                "SELECT lsn::text FROM pg_catalog.pg_create_logical_replication_slot(%s, 'test_decoding')",
+                (slot_name,),
+            )
+            lsn = cursor.fetchone()[0]
+            conn.commit()
+        self.logger.info('Replication slot "%s" created at %s', slot_name, lsn)
+        return lsn
+
+    def drop_replication_slot(self, slot_name: str) -> None:
+        with self._connection() as conn, conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT pg_catalog.pg_drop_replication_slot(slot_name) "
+                "FROM pg_catalog.pg_replication_slots WHERE slot_name = %s",
+                (slot_name,),
+            )
+            conn.commit()
+
+    def set_read_only(self, read_only: bool) -> None:
+        """
+        Makes new sessions of the database read-only by default, existing sessions are not affected.
+        """
+        database = sql.Identifier(self.database)
+        with self._connection() as conn, conn.cursor() as cursor:
+            cursor.execute("SET TRANSACTION READ WRITE")
+            if read_only:
+                cursor.execute(sql.SQL("ALTER DATABASE {} SET default_transaction_read_only = on").format(database))
+            else:
+                cursor.execute(sql.SQL("ALTER DATABASE {} RESET default_transaction_read_only").format(database))
+            conn.commit()
+
+    def terminate_client_backends(self) -> int:
+        """
+        Terminates sessions of all other clients connected to the database. Replication connections
+        and sessions opened by this tool are kept.
+
+        :return: Number of terminated sessions
+        """
+        with self._connection() as conn, conn.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT count(*) FILTER (WHERE pg_terminate_backend(pid))
+                FROM pg_catalog.pg_stat_activity
+                WHERE datname = current_database()
+                  AND backend_type = 'client backend'
+                  AND pid != pg_backend_pid()
+                  AND application_name != %s
+                  AND usename != 'rdsadmin'
+                """,
+                (APPLICATION_NAME,),
+            )
+            return cursor.fetchone()[0]
+
+    def get_primary_keys(self) -> dict[str, list[str]]:
+        return self.catalog.primary_keys
+
+    def get_column_sizes(self, table: str, columns: list[str]) -> list[ColumnSize]:
+        """
+        Measures the largest value of every column in its text form, as DMS migrates them.
+        Reads the whole table once, a single aggregate for all columns.
+        """
+        query = sql.SQL("SELECT {aggregates} FROM {table}").format(
+            aggregates=sql.SQL(", ").join(
+                sql.SQL("COALESCE(max(octet_length({}::text)), 0)").format(sql.Identifier(column)) for column in columns
+            ),
+            table=table_identifier(table),
         )
-        tables = [f"{row[0]}.{row[1]}" for row in cursor.fetchall()]
-        cursor.close()
-        conn.close()
-        return tables
-
-    def truncate_database(self):
-        conn = self.__get_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            """
-            SELECT schema_name
-            FROM information_schema.schemata
-            WHERE (schema_name NOT LIKE 'pg_%'
-              AND schema_name != 'information_schema') or schema_name = 'pglogical';
+        with self._connection() as conn, conn.cursor() as cursor:
+            cursor.execute(query)
+            row = cursor.fetchone()
+        return [ColumnSize(column=column, max_bytes=max_bytes) for column, max_bytes in zip(columns, row, strict=True)]
+
+    def get_key_boundaries(
+        self,
+        table: str,
+        key_columns: list[str],
+        step: int,
+        lower: list | None = None,
+        upper: list | None = None,
+        sample_percent: float | None = None,
+    ) -> list[tuple]:
         """
+        Returns every ``step``-th key of ``table`` in key order within the (lower, upper] range.
+
+        :param sample_percent: Reads only this percentage of table pages (TABLESAMPLE SYSTEM), ``step`` then
+            counts sampled rows
+        """
+        condition, params = key_range_condition(key_columns, lower, upper)
+        columns = sql.SQL(", ").join(map(sql.Identifier, key_columns))
+        query = sql.SQL(
+            "SELECT {columns} FROM ("
+            "SELECT {columns}, row_number() OVER (ORDER BY {columns}) AS rn FROM {table} {sample} WHERE {condition}"
+            ") s WHERE rn %% {step} = 0 ORDER BY {columns}"
+        ).format(
+            columns=columns,
+            table=table_identifier(table),
+            sample=sql.SQL("TABLESAMPLE SYSTEM ({})").format(sql.Literal(sample_percent))
+            if sample_percent is not None
+            else sql.SQL(""),
+            condition=condition,
+            step=sql.Literal(step),
         )
-        schemas = [row[0] for row in cursor.fetchall()]
-        for schema in schemas:
-            # FIXME: S608 Possible SQL injection vector through string-based query construction
-            cursor.execute(f"SELECT tablename FROM pg_tables WHERE schemaname = '{schema}'")  # noqa: S608
-            tables = [row[0] for row in cursor.fetchall()]
-            for table in tables:
-                cursor.execute(f"TRUNCATE TABLE {schema}.{table} CASCADE")
-        conn.commit()
-        cursor.close()
-        conn.close()
+        with self._connection() as conn, conn.cursor() as cursor:
+            cursor.execute(query, params)
+            return cursor.fetchall()
 
-    def get_sequences(self) -> list[dict[str, int | str]]:
-        conn = self.__get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT schemaname, sequencename, last_value FROM pg_sequences;")
-        sequences = [
-            {
-                "schema": row[0],
-                "sequence": row[1],
-                "last_value": row[2] or 1,
-            }
-            for row in cursor.fetchall()
+    def hash_range(
+        self,
+        table: str,
+        key_columns: list[str],
+        lower: list | None = None,
+        upper: list | None = None,
+    ) -> tuple[int, str | None]:
+        """
+        :return: Row count and md5 of the ordered row hashes within the (lower, upper] key range.
+        """
+        condition, params = key_range_condition(key_columns, lower, upper)
+        query = sql.SQL(
+            "SELECT count(*), md5(string_agg(md5(t::text), '' ORDER BY {columns})) FROM {table} t WHERE {condition}"
+        ).format(
+            columns=sql.SQL(", ").join(map(sql.Identifier, key_columns)),
+            table=table_identifier(table),
+            condition=condition,
+        )
+        with self._connection() as conn, conn.cursor() as cursor:
+            cursor.execute(query, params)
+            return cursor.fetchone()
+
+    def hash_rows(
+        self,
+        table: str,
+        key_columns: list[str],
+        lower: list | None = None,
+        upper: list | None = None,
+    ) -> dict[tuple, str]:
+        """
+        :return: md5 of every row within the (lower, upper] key range, keyed by primary key.
+        """
+        condition, params = key_range_condition(key_columns, lower, upper)
+        query = sql.SQL("SELECT {columns}, md5(t::text) FROM {table} t WHERE {condition}").format(
+            columns=sql.SQL(", ").join(sql.SQL("t.{}").format(sql.Identifier(column)) for column in key_columns),
+            table=table_identifier(table),
+            condition=condition,
+        )
+        with self._connection() as conn, conn.cursor() as cursor:
+            cursor.execute(query, params)
+            return {tuple(row[:-1]): row[-1] for row in cursor.fetchall()}
+
+    def truncate_database(self, batch_size: int = 1000) -> int:
+        """
+        Truncates every user table with as few ``TRUNCATE ... CASCADE`` statements as possible.
+        Partitions are truncated through their partitioned parent.
+
+        :return: Number of truncated tables
+        """
+        started_at = time.monotonic()
+        tables = [
+            sql.Identifier(table.schema, table.name) for table in self.catalog.tables.values() if table.parent is None
         ]
-        cursor.close()
-        conn.close()
-        return sequences
-
-    def set_sequences(self, sequences: list[dict[str, int | str]]):
-        conn = self.__get_connection()
-        cursor = conn.cursor()
-        for sequence in sequences:
-            if sequence["sequence"].startswith("awsdms_ddl_audit"):
-                continue
-            cursor.execute(f"SELECT setval('{sequence['schema']}.{sequence['sequence']}', {sequence['last_value']})")
-        conn.commit()
-        cursor.close()
-        conn.close()
+        with self._connection() as conn, conn.cursor() as cursor:
+            for offset in range(0, len(tables), batch_size):
+                cursor.execute(
+                    sql.SQL("TRUNCATE TABLE {} CASCADE").format(
+                        sql.SQL(", ").join(tables[offset : offset + batch_size])
+                    )
+                )
+            conn.commit()
+        self.invalidate_catalog()
+        self.logger.info(
+            'Truncated %s tables in "%s" database on "%s" in %.1fs',
+            len(tables),
+            self.database,
+            self.host,
+            time.monotonic() - started_at,
+        )
+        return len(tables)
+
+    def get_sequences(self) -> list[dict[str, int | str]]:
+        # Values change constantly, so they are always read live instead of from the catalog snapshot
+        with self._connection() as conn, conn.cursor() as cursor:
+            cursor.execute("SELECT schemaname, sequencename, last_value FROM pg_sequences;")
+            return [
+                {
+                    "schema": row[0],
+                    "sequence": row[1],
+                    "last_value": row[2] or 1,
+                }
+                for row in cursor.fetchall()
+            ]
+
+    def set_sequences(self, sequences: list[dict[str, int | str]], margin: int = 0, batch_size: int = 5000) -> int:
+        """
+        Sets sequences in batches of ``batch_size`` with one ``setval`` statement per batch.
+
+        :param margin: Added to ``last_value`` (subtracted for descending sequences), clamped to sequence bounds
+        :return: Number of sequences set
+        """
+        sequences = [sequence for sequence in sequences if not sequence["sequence"].startswith("awsdms_ddl_audit")]
+        query = """
+            SELECT count(setval(
+                format('%%I.%%I', s.schema_name, s.sequence_name)::regclass,
+                -- Compared before adding the margin, so values near the bounds do not overflow bigint
+                CASE
+                    WHEN ps.increment_by > 0 AND s.last_value > ps.max_value - %(margin)s THEN ps.max_value
+                    WHEN ps.increment_by > 0 THEN s.last_value + %(margin)s
+                    WHEN s.last_value < ps.min_value + %(margin)s THEN ps.min_value
+                    ELSE s.last_value - %(margin)s
+                END
+            ))
+            FROM unnest(%(schemas)s::text[], %(names)s::text[], %(values)s::bigint[])
+                AS s(schema_name, sequence_name, last_value)
+            JOIN pg_catalog.pg_sequences ps ON ps.schemaname = s.schema_name AND ps.sequencename = s.sequence_name;
+        """
+        updated = 0
+        with self._connection() as conn, conn.cursor() as cursor:
+            for offset in range(0, len(sequences), batch_size):
+                batch = sequences[offset : offset + batch_size]
+                cursor.execute(
+                    query,
+                    {
+                        "margin": margin,
+                        "schemas": [sequence["schema"] for sequence in batch],
+                        "names": [sequence["sequence"] for sequence in batch],
+                        "values": [sequence["last_value"] for sequence in batch],
+                    },
+                )
+                updated += cursor.fetchone()[0]
+            conn.commit()
+        if updated != len(sequences):
+            self.logger.warning(
+                '%s of %s sequences are missing in "%s" database on "%s"',
+                len(sequences) - updated,
+                len(sequences),
+                self.database,
+                self.host,
+            )
+        return updated
+
+    def truncate_tables(self, tables: list[str]) -> None:
+        """
+        Empties tables before DMS reloads them. Tables referenced by foreign keys of other tables cannot be
+        truncated on their own, their rows are deleted with foreign key triggers disabled instead.
+        """
+        with self._connection() as conn, conn.cursor() as cursor:
+            try:
+                cursor.execute(sql.SQL("TRUNCATE TABLE {}").format(sql.SQL(", ").join(map(table_identifier, tables))))
+            except errors.FeatureNotSupported:
+                conn.rollback()
+                cursor.execute("SET LOCAL session_replication_role = replica")
+                for table in tables:
+                    cursor.execute(sql.SQL("DELETE FROM {}").format(table_identifier(table)))
+            conn.commit()
+
+    def count(self, table: str) -> int:
+        with self._connection() as conn, conn.cursor() as cursor:
+            cursor.execute(sql.SQL("SELECT COUNT(*) FROM {}").format(table_identifier(table)))
+            return cursor.fetchone()[0]
 
     def iter_count(self, tables: list[str]) -> Generator[int, None, None]:
-        conn = self.__get_connection()
-        cursor = conn.cursor()
-        for table in tables:
-            cursor.execute(f"SELECT COUNT(*) FROM {table}")  # noqa: S608
-            yield cursor.fetchone()[0]
-        cursor.close()
-        conn.close()
+        with self._connection() as conn, conn.cursor() as cursor:
+            for table in tables:
+                cursor.execute(sql.SQL("SELECT COUNT(*) FROM {}").format(table_identifier(table)))
+                yield cursor.fetchone()[0]
@@ -1,23 +1,26 @@
 import abc
-import time
-from datetime import UTC, datetime, timedelta
 from typing import Literal, Optional
 
-import boto3
 from botocore.exceptions import ClientError
 
+from rds_encryptor.aws import DescribeCache, LazyClient
 from rds_encryptor.rds.instance import RDSInstance
 from rds_encryptor.utils import MIGRATION_SEED, get_logger, normalize_aws_id
+from rds_encryptor.waiter import Waiter
 
 
 class BaseEndpoint(abc.ABC):
     logger = get_logger("BaseEndpoint")
-    aws_client = boto3.client("dms")
+    aws_client = LazyClient("dms")
     endpoint_type: Literal["source", "target"]
     additional_settings: dict[str, str] = None
 
-    def __init__(self, rds_instance: RDSInstance, database: str, kms_key_arn: str):
+    def __init__(self, rds_instance: RDSInstance, database: str, kms_key_arn: str, slot_name: str | None = None):
+        """
+        :param slot_name: Existing logical replication slot to read changes from, created with test_decoding
+        """
         self.rds_instance = rds_instance
+        self.slot_name = slot_name
         self.database = database
         self.endpoint_id = normalize_aws_id(
             f"{self.endpoint_type}-{self.rds_instance.instance_id}-{self.database}-{MIGRATION_SEED}"
@@ -50,6 +53,7 @@ class BaseEndpoint(abc.ABC):
                 "Username": self.rds_instance.master_username,
                 "Password": self.rds_instance.master_password,
                 **(self.additional_settings or {}),
+                **({"SlotName": self.slot_name, "PluginName": "test-decoding"} if self.slot_name else {}),
             },
             Tags=self.rds_instance.tags,
         )
@@ -57,15 +61,23 @@ class BaseEndpoint(abc.ABC):
         self._arn = response["Endpoint"]["EndpointArn"]
         return self
 
-    def _describe(self):
-        response = self.aws_client.describe_endpoints(Filters=[{"Name": "endpoint-id", "Values": [self.endpoint_id]}])
+    def _describe(self, max_age: float | None = None):
+        """
+        :param max_age: Oldest cached description accepted in seconds, 0 reads the current state
+        """
+        response = DescribeCache.describe(
+            "dms",
+            "describe_endpoints",
+            max_age=max_age,
+            Filters=[{"Name": "endpoint-id", "Values": [self.endpoint_id]}],
+        )
         if len(response["Endpoints"]) > 1:
             raise ValueError(f"Multiple endpoints found: {self.endpoint_id}")
 
         return response["Endpoints"][0]
 
     def get_status(self) -> str:
-        return self._describe()["Status"]
+        return self._describe(max_age=0)["Status"]
 
     def get_endpoint(self) -> Optional["BaseEndpoint"]:
         try:
@@ -87,18 +99,21 @@ class BaseEndpoint(abc.ABC):
         return self.create_endpoint()
 
     def wait_until_created(self, timeout: int = 60 * 60, pooling_frequency: int = 30) -> "BaseEndpoint":
-        timeout_dt = datetime.now(tz=UTC) + timedelta(seconds=timeout)
         self.logger.info('Waiting for %s endpoint "%s" to become available ...', self.endpoint_type, self.endpoint_id)
 
-        while datetime.now(tz=UTC) < timeout_dt:
+        def poll() -> tuple[bool, str]:
             status = self.get_status()
-            if status == "active":
-                self.logger.info('Endpoint "%s" is active', self.endpoint_id)
-                return self
-            self.logger.debug("Endpoint %s is in status %s, waiting...", self.endpoint_id, status)
-            time.sleep(pooling_frequency)
-
-        raise TimeoutError(f"Endpoint {self.endpoint_id} creation timeout")
+            return status == "active", status
+
+        Waiter.wait(
+            kind="dms-endpoint-active",
+            name=self.endpoint_id,
+            poll=poll,
+            timeout=timeout,
+            interval=pooling_frequency,
+        )
+        self.logger.info('Endpoint "%s" is active', self.endpoint_id)
+        return self
 
 
 class SourceEndpoint(BaseEndpoint):
@@ -0,0 +1,92 @@
+import math
+from typing import NamedTuple
+
+from rds_encryptor.catalog import CatalogTable
+from rds_encryptor.db_manager import ColumnSize, DBManager
+from rds_encryptor.dms.migration_task import TableSettings
+from rds_encryptor.rds.instance import RDSInstance
+from rds_encryptor.utils import get_logger
+
+MIN_LOB_MAX_SIZE_KB = 1
+# Larger LOBs are migrated in full LOB mode, limited mode allocates LobMaxSize for every LOB value
+MAX_LIMITED_LOB_SIZE_KB = 100 * 1024
+FULL_LOB_CHUNK_SIZE_KB = 64
+
+
+class TableLobProfile(NamedTuple):
+    table: CatalogTable
+    columns: list[ColumnSize]
+
+    @property
+    def required_size_kb(self) -> int:
+        """Smallest LobMaxSize that fits every value of the table in KB."""
+        max_bytes = max((column.max_bytes for column in self.columns), default=0)
+        return max(math.ceil(max_bytes / 1024), MIN_LOB_MAX_SIZE_KB)
+
+
+class LobPlan(NamedTuple):
+    lob_max_size_kb: int
+    table_settings: list[TableSettings]
+
+
+class LobProfiler:
+    """
+    Measures LOB column (text, bytea, json, jsonb, xml, unbounded varchar) sizes of one source database.
+
+    Every table is scanned in full: a sampled maximum can miss the largest value, which limited LOB mode
+    would then truncate on the target.
+    """
+
+    logger = get_logger("LobProfiler")
+
+    def __init__(self, source_instance: RDSInstance, database: str):
+        self.db_manager = DBManager.from_rds(rds_instance=source_instance, database=database)
+        self.database = database
+
+    def profile_table(self, table: CatalogTable) -> TableLobProfile:
+        columns = self.db_manager.get_column_sizes(table.qualified_name, list(table.lob_columns))
+        return TableLobProfile(table=table, columns=columns)
+
+    def profile(self) -> list[TableLobProfile]:
+        tables = [
+            table
+            for table in self.db_manager.catalog.user_tables
+            # DMS loads leaf partitions, partitioned parents hold no rows
+            if table.lob_columns and not table.is_partitioned
+        ]
+        profiles = [self.profile_table(table) for table in tables]
+        for profile in profiles:
+            self.logger.debug(
+                '"%s" database table "%s" LOB sizes: %s',
+                self.database,
+                profile.table.qualified_name,
+                ", ".join(f"{c.column} max {c.max_bytes}B" for c in profile.columns),
+            )
+        return profiles
+
+
+def plan_lob_settings(profiles: list[TableLobProfile], task_quantile: float = 0.9) -> LobPlan:
+    """
+    Picks a task-wide LobMaxSize that fits ``task_quantile`` of the tables, the remaining tables get their
+    own limited LOB size, or full LOB mode when their values are larger than ``MAX_LIMITED_LOB_SIZE_KB``.
+    """
+    if not profiles:
+        return LobPlan(lob_max_size_kb=MIN_LOB_MAX_SIZE_KB, table_settings=[])
+
+    required = sorted(profile.required_size_kb for profile in profiles)
+    lob_max_size_kb = min(required[math.ceil(task_quantile * len(required)) - 1], MAX_LIMITED_LOB_SIZE_KB)
+    table_settings = []
+    for profile in profiles:
+        required_size_kb = profile.required_size_kb
+        if required_size_kb <= lob_max_size_kb:
+            continue
+        if required_size_kb > MAX_LIMITED_LOB_SIZE_KB:
+            lob_settings = {"mode": "unlimited", "bulk-max-size": str(FULL_LOB_CHUNK_SIZE_KB)}
+        else:
+            lob_settings = {"mode": "limited", "bulk-max-size": str(required_size_kb)}
+        table_settings.append(
+            TableSettings(
+                schema=profile.table.schema, table=profile.table.name, settings={"lob-settings": lob_settings}
+            )
+        )
+    return LobPlan(lob_max_size_kb=lob_max_size_kb, table_settings=table_settings)
@@ -1,14 +1,17 @@
+import copy
 import json
 import time
 from datetime import UTC, datetime, timedelta
 from typing import Literal, NamedTuple
 
-import boto3
+from botocore.exceptions import ClientError
 
+from rds_encryptor.aws import LazyClient
 from rds_encryptor.dms.endpoints import SourceEndpoint, TargetEndpoint
 from rds_encryptor.dms.enums import MigrationType, ReplicationTaskStatus
 from rds_encryptor.dms.replication_instance import ReplicationInstance
 from rds_encryptor.utils import get_logger, normalize_aws_id
+from rds_encryptor.waiter import AdaptiveBackoff, Waiter
 
 
 class TaskFailedException(Exception):
@@ -19,12 +22,69 @@ class TaskFailedException(Exception):
         self.last_failure_message = last_failure_message
 
 
+class TaskState(NamedTuple):
+    status: ReplicationTaskStatus
+    full_load_progress: int
+    stop_reason: str | None
+    last_failure_message: str | None
+
+    @classmethod
+    def from_description(cls, description: dict) -> "TaskState":
+        return cls(
+            status=ReplicationTaskStatus(description["Status"]),
+            full_load_progress=description.get("ReplicationTaskStats", {}).get("FullLoadProgressPercent", 0),
+            stop_reason=description.get("StopReason"),
+            last_failure_message=description.get("LastFailureMessage"),
+        )
+
+
+# Tables DMS gave up on, e.g. suspended because of TableErrorPolicy SUSPEND_TABLE
+FAILED_TABLE_STATES = ("Table error", "Table cancelled")
+FAILED_VALIDATION_STATES = ("Mismatched records", "Suspended records", "Error")
+
+
+class TableStatistics(NamedTuple):
+    schema: str
+    table: str
+    state: str
+    validation_state: str | None
+    full_load_rows: int
+    last_update_time: datetime | None
+
+    @classmethod
+    def from_description(cls, description: dict) -> "TableStatistics":
+        return cls(
+            schema=description["SchemaName"],
+            table=description["TableName"],
+            state=description["TableState"],
+            validation_state=description.get("ValidationState"),
+            full_load_rows=description.get("FullLoadRows", 0),
+            last_update_time=description.get("LastUpdateTime"),
+        )
+
+    @property
+    def qualified_name(self) -> str:
+        return f"{self.schema}.{self.table}"
+
+    @property
+    def is_failed(self) -> bool:
+        return self.state in FAILED_TABLE_STATES or self.validation_state in FAILED_VALIDATION_STATES
+
+
 class TableMapping(NamedTuple):
     schema: Literal["%"] | str
     table: Literal["%"] | str
     action: Literal["include", "exclude"]
 
 
+class TableSettings(NamedTuple):
+    """DMS table-settings rule, e.g. {"lob-settings": {...}} or {"parallel-load": {...}}."""
+
+    schema: str
+    table: str
+    settings: dict
+
+
 DEFAULT_REPLICATE_TASK_SETTINGS = {
     "Logging": {
         "EnableLogging": True,
@@ -165,13 +225,68 @@ DEFAULT_REPLICATE_TASK_SETTINGS = {
 DEFAULT_REPLICATE_TASK_SETTINGS_JSON = json.dumps(DEFAULT_REPLICATE_TASK_SETTINGS)
 
 
+def get_task_settings(enable_validation: bool = True, idempotent_apply: bool = False) -> dict:
+    """
+    :param enable_validation: Enables DMS row-level validation
+    :param idempotent_apply: Applies changes the target already has as upserts, for CDC started from an LSN
+        older than the data on the target
+    """
+    settings = copy.deepcopy(DEFAULT_REPLICATE_TASK_SETTINGS)
+    settings["ValidationSettings"]["EnableValidation"] = enable_validation
+    if idempotent_apply:
+        settings["ErrorBehavior"]["ApplyErrorInsertPolicy"] = "INSERT_RECORD"
+        settings["ErrorBehavior"]["ApplyErrorUpdatePolicy"] = "UPDATE_RECORD"
+        settings["ErrorBehavior"]["ApplyErrorDeletePolicy"] = "IGNORE_RECORD"
+    return settings
+
+
+def get_table_mappings_rules(
+    table_mappings: list[TableMapping], table_settings: list[TableSettings] | None = None
+) -> dict:
+    """
+    :param table_settings: Per-table settings, settings of the same table are merged into one rule
+    :return: TableMappings document of a replication task
+    """
+    table_mappings_rules = {
+        "rules": [
+            {
+                "rule-type": "selection",
+                "rule-id": str(idx + 1),
+                "rule-name": str(idx + 1),
+                "object-locator": {
+                    "schema-name": rule.schema,
+                    "table-name": rule.table,
+                },
+                "rule-action": rule.action,
+                "filters": [],
+            }
+            for idx, rule in enumerate(table_mappings)
+        ]
+    }
+    merged_settings: dict[tuple[str, str], dict] = {}
+    for rule in table_settings or []:
+        merged_settings.setdefault((rule.schema, rule.table), {}).update(rule.settings)
+    table_mappings_rules["rules"].extend(
+        {
+            "rule-type": "table-settings",
+            "rule-id": str(idx),
+            "rule-name": str(idx),
+            "object-locator": {"schema-name": schema, "table-name": table},
+            **settings,
+        }
+        for idx, ((schema, table), settings) in enumerate(merged_settings.items(), start=len(table_mappings) + 1)
+    )
+    return table_mappings_rules
+
+
 class MigrationTask:
     logger = get_logger("MigrationTask")
-    aws_client = boto3.client("dms")
+    aws_client = LazyClient("dms")
 
-    def __init__(self, task_id: str, arn: str):
+    def __init__(self, task_id: str, arn: str, migration_type: MigrationType = MigrationType.migrate_replicate):
         self.task_id = task_id
         self.arn = arn
+        self.migration_type = migration_type
 
     def _describe(self) -> dict:
         response = self.aws_client.describe_replication_tasks(
@@ -195,20 +310,23 @@ class MigrationTask:
         """
         :param expected_status: ReplicationTaskStatus
         :param timeout: Timeout in seconds. Default is 4 hours
-        :param pooling_frequency: Pooling frequency in seconds. Default is 1 minute.
+        :param pooling_frequency: Longest pause between polls in seconds. Default is 1 minute.
         :return: MigrationTask or raise TimeoutError
         """
-        timeout_dt = datetime.now(tz=UTC) + timedelta(seconds=timeout)
 
-        while datetime.now(tz=UTC) < timeout_dt:
+        def poll() -> tuple[bool, str]:
             status = self.get_status()
-            if status == expected_status:
-                self.logger.info("Task %s is in status %s", self.task_id, status)
-                return self
-            self.logger.debug("Task %s is in status %s, waiting...", self.task_id, status)
-            time.sleep(pooling_frequency)
+            return status == expected_status, status
 
-        raise TimeoutError(f"Task {self.task_id} status is not {expected_status} after {timeout} seconds")
+        Waiter.wait(
+            kind=f"dms-task-{expected_status}",
+            name=self.task_id,
+            poll=poll,
+            timeout=timeout,
+            interval=pooling_frequency,
+        )
+        self.logger.info("Task %s is in status %s", self.task_id, expected_status)
+        return self
 
     def wait_until_ready(self) -> "MigrationTask":
         self.logger.info("Waiting for task %s to be ready ...", self.task_id)
@@ -222,34 +340,110 @@ class MigrationTask:
         self.logger.info("Task %s started", self.task_id)
         return self
 
+    def stop_task(self) -> "MigrationTask":
+        self.logger.info("Stopping task %s ...", self.task_id)
+        self.aws_client.stop_replication_task(ReplicationTaskArn=self.arn)
+        return self
+
+    def wait_until_stopped(self) -> "MigrationTask":
+        return self._wait_until(ReplicationTaskStatus.STOPPED, timeout=30 * 60, pooling_frequency=15)
+
+    def get_table_statistics(self) -> list[TableStatistics]:
+        statistics = []
+        kwargs = {"ReplicationTaskArn": self.arn, "MaxRecords": 500}
+        while True:
+            response = self.aws_client.describe_table_statistics(**kwargs)
+            statistics.extend(TableStatistics.from_description(table) for table in response["TableStatistics"])
+            if not response.get("Marker"):
+                return statistics
+            kwargs["Marker"] = response["Marker"]
+
+    def reload_tables(self, tables: list[str]) -> "MigrationTask":
+        """
+        Reloads only the given tables in the running task, the rest of the task keeps replicating changes.
+
+        :param tables: Qualified "schema.table" names
+        """
+        self.logger.info("[Task %s] Reloading %s tables: %s", self.task_id, len(tables), ", ".join(tables))
+        self.aws_client.reload_tables(
+            ReplicationTaskArn=self.arn,
+            TablesToReload=[
+                {"SchemaName": schema, "TableName": table}
+                for schema, table in (table.split(".", maxsplit=1) for table in tables)
+            ],
+            ReloadOption="data-reload",
+        )
+        return self
+
+    def wait_until_tables_loaded(
+        self, reloaded: list[TableStatistics], timeout: int = 4 * 60 * 60, pooling_frequency: int = 60
+    ) -> list[TableStatistics]:
+        """
+        :param reloaded: Statistics of the reloaded tables read before the reload
+        :return: Statistics of the tables that failed again
+        """
+        # A table is done once DMS updated its statistics after the reload, comparing DMS timestamps
+        # with each other is not affected by the local clock
+        previous = {table.qualified_name: table.last_update_time for table in reloaded}
+        pending = set(previous)
+
+        def poll() -> tuple[bool, str]:
+            loading = [
+                table
+                for table in self.get_table_statistics()
+                if table.qualified_name in pending
+                and (
+                    table.last_update_time == previous[table.qualified_name]
+                    or (table.state != "Table completed" and not table.is_failed)
+                )
+            ]
+            return not loading, f"{len(loading)}/{len(pending)} tables loading"
+
+        Waiter.wait(
+            kind="dms-table-reload",
+            name=self.task_id,
+            poll=poll,
+            timeout=timeout,
+            interval=pooling_frequency,
+        )
+        return [table for table in self.get_table_statistics() if table.qualified_name in pending and table.is_failed]
+
+    def check_finished(self, state: TaskState) -> bool:
+        """
+        :return: True once the task stopped normally or completed the full load and replicates changes
+        :raise TaskFailedException: If the task stopped for any other reason or failed
+        """
+        if state.status == ReplicationTaskStatus.STOPPED and state.stop_reason == "Stop Reason NORMAL":
+            self.logger.info("[Task %s] Task finished", self.task_id)
+            return True
+        if state.status == ReplicationTaskStatus.RUNNING and state.full_load_progress == 100:
+            self.logger.info("[Task %s] Full load completed", self.task_id)
+            return True
+        if state.status == ReplicationTaskStatus.RUNNING and self.migration_type == MigrationType.replicate:
+            self.logger.info("[Task %s] Replicating changes", self.task_id)
+            return True
+        if state.status in (ReplicationTaskStatus.STOPPED, ReplicationTaskStatus.FAILED):
+            raise TaskFailedException(
+                task=self,
+                status=state.status,
+                stop_reason=state.stop_reason,
+                last_failure_message=state.last_failure_message,
+            )
+        return False
+
     def wait_until_finished(self, timeout: int = 4 * 60 * 60, pooling_frequency: int = 2 * 60) -> "MigrationTask":
         timeout_dt = datetime.now(tz=UTC) + timedelta(seconds=timeout)
 
         while datetime.now(tz=UTC) < timeout_dt:
-            response = self._describe()
-            status = ReplicationTaskStatus(response["Status"])
-            stop_reason = response.get("StopReason")
-            last_failure_message = response.get("LastFailureMessage")
-            full_load_progress = response.get("ReplicationTaskStats", {}).get("FullLoadProgressPercent", 0)
-            if status == ReplicationTaskStatus.STOPPED and stop_reason == "Stop Reason NORMAL":
-                self.logger.info("[Task %s] Task finished", self.task_id)
-                return self
-            if status == ReplicationTaskStatus.RUNNING and full_load_progress == 100:
-                self.logger.info("[Task %s] Full load completed", self.task_id)
+            state = TaskState.from_description(self._describe())
+            if self.check_finished(state):
                 return self
-            if status in (ReplicationTaskStatus.STOPPED, ReplicationTaskStatus.FAILED):
-                raise TaskFailedException(
-                    task=self,
-                    status=status,
-                    stop_reason=stop_reason,
-                    last_failure_message=last_failure_message,
-                )
 
             self.logger.info(
                 "[Task %s] Task status: %s, full load progress %s/100 waiting...",
                 self.task_id,
-                status,
-                full_load_progress,
+                state.status,
+                state.full_load_progress,
             )
             time.sleep(pooling_frequency)
 
@@ -265,24 +459,21 @@ class MigrationTask:
         migration_type: MigrationType,
         table_mappings: list[TableMapping],
         tags: list[dict[str, str]] = None,  # noqa: RUF013
+        task_settings: dict | None = None,
+        wait_for_replication_instance: bool = True,
+        timeout: int = 60 * 60,
+        cdc_start_position: str | None = None,
+        table_settings: list[TableSettings] | None = None,
     ):
+        """
+        :param cdc_start_position: LSN where CDC-only tasks start to replicate changes
+        :param table_settings: Per-table settings, settings of the same table are merged into one rule
+        :param wait_for_replication_instance: Wait until the replication instance is active again after
+            the task is created. Disable it when creating several tasks and wait once for all of them
+        :param timeout: How long to retry while the replication instance is busy with another task in seconds
+        """
         # TODO: Add check if the task already exists
-        table_mappings_rules = {
-            "rules": [
-                {
-                    "rule-type": "selection",
-                    "rule-id": str(idx + 1),
-                    "rule-name": str(idx + 1),
-                    "object-locator": {
-                        "schema-name": rule.schema,
-                        "table-name": rule.table,
-                    },
-                    "rule-action": rule.action,
-                    "filters": [],
-                }
-                for idx, rule in enumerate(table_mappings)
-            ]
-        }
+        table_mappings_rules = get_table_mappings_rules(table_mappings, table_settings)
         normalized_id = normalize_aws_id(name)
         cls.logger.info(
             'Creating migration task "%s" from "%s" to "%s" '
@@ -294,17 +485,39 @@ class MigrationTask:
             str(table_mappings),
             replication_instance.arn,
         )
-        response = cls.aws_client.create_replication_task(
-            ReplicationTaskIdentifier=normalized_id,
-            SourceEndpointArn=source_endpoint.arn,
-            TargetEndpointArn=target_endpoint.arn,
-            ReplicationInstanceArn=replication_instance.arn,
-            MigrationType=str(migration_type),
-            TableMappings=json.dumps(table_mappings_rules),
-            ReplicationTaskSettings=DEFAULT_REPLICATE_TASK_SETTINGS_JSON,
-            Tags=tags or [],
-        )["ReplicationTask"]
-        # Replication Task is modifying the replication instance, so we need to wait until it's active
-        replication_instance.wait_until_active()
+        backoff = AdaptiveBackoff(min_interval=5, max_interval=60)
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                response = cls.aws_client.create_replication_task(
+                    ReplicationTaskIdentifier=normalized_id,
+                    SourceEndpointArn=source_endpoint.arn,
+                    TargetEndpointArn=target_endpoint.arn,
+                    ReplicationInstanceArn=replication_instance.arn,
+                    MigrationType=str(migration_type),
+                    TableMappings=json.dumps(table_mappings_rules),
+                    ReplicationTaskSettings=(
+                        json.dumps(task_settings) if task_settings is not None else DEFAULT_REPLICATE_TASK_SETTINGS_JSON
+                    ),
+                    Tags=tags or [],
+                    **({"CdcStartPosition": cdc_start_position} if cdc_start_position else {}),
+                )["ReplicationTask"]
+                break
+            except ClientError as e:
+                # Tasks created at the same time keep the replication instance in "modifying" state
+                if e.response["Error"]["Code"] != "InvalidResourceStateFault" or time.monotonic() > deadline:
+                    raise
+                interval = backoff.next_interval()
+                cls.logger.info(
+                    'Replication instance is busy, retrying to create task "%s" in %.0fs', normalized_id, interval
+                )
+                time.sleep(interval)
+        if wait_for_replication_instance:
+            # Replication Task is modifying the replication instance, so we need to wait until it's active
+            replication_instance.wait_until_active()
         cls.logger.info('Migration task "%s" created', normalized_id)
-        return cls(task_id=response["ReplicationTaskIdentifier"], arn=response["ReplicationTaskArn"])
+        return cls(
+            task_id=response["ReplicationTaskIdentifier"],
+            arn=response["ReplicationTaskArn"],
+            migration_type=migration_type,
+        )
@@ -1,50 +1,98 @@
-import time
 from datetime import UTC, datetime, timedelta
 from typing import Optional
 
-import boto3
-
+from rds_encryptor.aws import DescribeCache, LazyClient
 from rds_encryptor.utils import get_logger
+from rds_encryptor.waiter import Waiter
 
 
 class ReplicationInstance:
-    aws_client = boto3.client("dms")
+    aws_client = LazyClient("dms")
+    cloudwatch_client = LazyClient("cloudwatch")
     logger = get_logger("ReplicationInstance")
+    metric_names = ("FreeableMemory", "SwapUsage", "CPUUtilization")
 
     def __init__(self, arn: str):
         self.arn = arn
 
-    def get_status(self) -> str:
-        response = self.aws_client.describe_replication_instances(
-            Filters=[{"Name": "replication-instance-arn", "Values": [self.arn]}]
+    def _describe(self, max_age: float | None = None) -> dict:
+        """
+        :param max_age: Oldest cached description accepted in seconds, 0 reads the current state
+        """
+        response = DescribeCache.describe(
+            "dms",
+            "describe_replication_instances",
+            max_age=max_age,
+            Filters=[{"Name": "replication-instance-arn", "Values": [self.arn]}],
         )["ReplicationInstances"]
         if len(response) == 0:
             raise ValueError(f"Replication instance not found: {self.arn}")
         if len(response) > 1:
             raise ValueError(f"Multiple replication instances found: {self.arn}")
+        return response[0]
+
+    def get_status(self) -> str:
+        return self._describe(max_age=0)["ReplicationInstanceStatus"]
+
+    def get_instance_class(self) -> str:
+        return self._describe()["ReplicationInstanceClass"]
 
-        return response[0]["ReplicationInstanceStatus"]
+    def get_metrics(self, period: int = 60, lookback: int = 10 * 60) -> dict[str, float]:
+        """
+        :return: Latest CloudWatch value of every metric in ``metric_names``, metrics without datapoints are omitted
+        """
+        identifier = self._describe()["ReplicationInstanceIdentifier"]
+        now = datetime.now(tz=UTC)
+        response = self.cloudwatch_client.get_metric_data(
+            MetricDataQueries=[
+                {
+                    "Id": metric_name.lower(),
+                    "MetricStat": {
+                        "Metric": {
+                            "Namespace": "AWS/DMS",
+                            "MetricName": metric_name,
+                            "Dimensions": [{"Name": "ReplicationInstanceIdentifier", "Value": identifier}],
+                        },
+                        "Period": period,
+                        "Stat": "Average",
+                    },
+                }
+                for metric_name in self.metric_names
+            ],
+            StartTime=now - timedelta(seconds=lookback),
+            EndTime=now,
+            ScanBy="TimestampDescending",
+        )
+        metrics = {result["Id"]: result["Values"] for result in response["MetricDataResults"]}
+        return {
+            metric_name: metrics[metric_name.lower()][0]
+            for metric_name in self.metric_names
+            if metrics.get(metric_name.lower())
+        }
 
     def wait_until_active(self, timeout: int = 60 * 60, pooling_frequency: int = 60) -> "ReplicationInstance":
-        timeout_dt = datetime.now(tz=UTC) + timedelta(seconds=timeout)
         self.logger.info('Waiting for replication instance "%s" to become active ...', self.arn)
 
-        while datetime.now(tz=UTC) < timeout_dt:
+        def poll() -> tuple[bool, str]:
             status = self.get_status()
-            if status == "available":
-                self.logger.info('Replication instance "%s" is active', self.arn)
-                return self
-            self.logger.debug("Replication instance %s is in status %s, waiting...", self.arn, status)
-            time.sleep(pooling_frequency)
+            return status == "available", status
 
-        raise TimeoutError(f"Replication instance {self.arn} creation timeout")
+        Waiter.wait(
+            kind="dms-replication-instance-available",
+            name=self.arn,
+            poll=poll,
+            timeout=timeout,
+            interval=pooling_frequency,
+        )
+        self.logger.info('Replication instance "%s" is active', self.arn)
+        return self
 
     @classmethod
     def from_arn(cls, arn: str) -> Optional["ReplicationInstance"]:
         assert arn, "Replication instance ARN is required"
 
-        response = cls.aws_client.describe_replication_instances(
-            Filters=[{"Name": "replication-instance-arn", "Values": [arn]}]
+        response = DescribeCache.describe(
+            "dms", "describe_replication_instances", Filters=[{"Name": "replication-instance-arn", "Values": [arn]}]
         )["ReplicationInstances"]
         if len(response) == 0:
             raise ValueError(f"Replication instance not found: {arn}")
@@ -0,0 +1,179 @@
+import json
+import re
+from collections import defaultdict
+from collections.abc import Iterable
+from functools import cache
+from itertools import groupby
+from typing import Literal
+
+from rds_encryptor.dms.migration_task import TableMapping, get_table_mappings_rules
+from rds_encryptor.utils import get_logger
+
+# Joins schema and table names in trie keys, cannot appear in PostgreSQL identifiers
+SEPARATOR = "\x00"
+
+
+@cache
+def _pattern_regex(pattern: str) -> re.Pattern:
+    """DMS object locators are matched like SQL LIKE with ``%`` as the only wildcard."""
+    return re.compile(".*".join(map(re.escape, pattern.split("%"))), re.DOTALL)
+
+
+def matches(rule: TableMapping, schema: str, table: str) -> bool:
+    return bool(_pattern_regex(rule.schema).fullmatch(schema) and _pattern_regex(rule.table).fullmatch(table))
+
+
+def _literal_prefix(pattern: str) -> str | None:
+    """:return: Prefix of ``prefix%`` patterns, None for any other pattern"""
+    if pattern.endswith("%") and "%" not in pattern[:-1]:
+        return pattern[:-1]
+    return None
+
+
+class _RuleIndex:
+    """Matches exact and ``prefix%`` rules with set lookups, so thousands of rules are checked quickly."""
+
+    def __init__(self, rules: list[TableMapping]):
+        self.tables: dict[str, set[str]] = defaultdict(set)
+        self.table_prefixes: dict[str, set[str]] = defaultdict(set)
+        # Prefixes of schemas whose every table matches
+        self.schema_prefixes: set[str] = set()
+        self.other: list[TableMapping] = []
+        for rule in rules:
+            table_prefix = _literal_prefix(rule.table)
+            schema_prefix = _literal_prefix(rule.schema)
+            if "%" not in rule.schema and "%" not in rule.table:
+                self.tables[rule.schema].add(rule.table)
+            elif "%" not in rule.schema and table_prefix is not None:
+                self.table_prefixes[rule.schema].add(table_prefix)
+            elif rule.table == "%" and schema_prefix is not None:
+                self.schema_prefixes.add(schema_prefix)
+            else:
+                self.other.append(rule)
+
+    def matches(self, schema: str, table: str) -> bool:
+        table_prefixes = self.table_prefixes.get(schema, ())
+        return (
+            table in self.tables.get(schema, ())
+            or any(schema[:idx] in self.schema_prefixes for idx in range(len(schema) + 1))
+            or any(table[:idx] in table_prefixes for idx in range(len(table) + 1))
+            or any(matches(rule, schema, table) for rule in self.other)
+        )
+
+
+def select_tables(rules: list[TableMapping], universe: Iterable[tuple[str, str]]) -> set[tuple[str, str]]:
+    """
+    Evaluates selection rules like DMS does: a table is migrated when an include rule matches it and no
+    exclude rule does, whatever the order of the rules is.
+    """
+    includes = _RuleIndex([rule for rule in rules if rule.action == "include"])
+    excludes = _RuleIndex([rule for rule in rules if rule.action == "exclude"])
+    return {
+        (schema, table)
+        for schema, table in universe
+        if includes.matches(schema, table) and not excludes.matches(schema, table)
+    }
+
+
+class RuleCompiler:
+    """
+    Replaces per-table selection rules with the fewest ``prefix%`` wildcard rules that match exactly the
+    same tables of ``universe``.
+
+    Schema and table names form one trie, walked over the sorted names. A subtree where every table is a
+    target becomes a single wildcard rule on its prefix, which is optimal: every rule has to cover a subtree
+    of targets only, so each maximal subtree of targets needs one rule. Compiled rules are checked against the universe
+    and the explicit rules are kept if they do not match exactly, e.g. for names containing ``%``.
+
+    Wildcards are only checked against the tables existing at planning time, a table created later matching
+    a prefix would be included or excluded without being planned. Tasks replicating changes pass
+    ``wildcards=False`` to keep the explicit rules.
+    """
+
+    logger = get_logger("RuleCompiler")
+
+    def __init__(self, universe: Iterable[tuple[str, str]], wildcards: bool = True):
+        self.universe = set(universe)
+        self.wildcards = wildcards
+
+    @staticmethod
+    def _prefix_pattern(prefix: str) -> tuple[str, str]:
+        if SEPARATOR in prefix:
+            schema, table = prefix.split(SEPARATOR, 1)
+            return schema, f"{table}%"
+        return f"{prefix}%", "%"
+
+    def _cover(self, keys: list[tuple[str, bool]], depth: int) -> list[tuple[str, str]]:
+        """
+        :param keys: Sorted trie keys sharing the first ``depth`` characters, with whether they are targets
+        :return: Patterns matching exactly the targets
+        """
+        targets = sum(is_target for _, is_target in keys)
+        prefix = keys[0][0][:depth]
+        if not targets:
+            return []
+        if targets == len(keys):
+            # The longest common prefix of the sorted keys (first and last) matches the same tables,
+            # but fewer of the tables created later
+            if len(keys) == 1:
+                return [tuple(keys[0][0].split(SEPARATOR, 1))]
+            first, last = keys[0][0], keys[-1][0]
+            common = next(
+                (idx for idx, (a, b) in enumerate(zip(first, last, strict=False)) if a != b),
+                min(len(first), len(last)),
+            )
+            return [self._prefix_pattern(first[:common])]
+        patterns = []
+        # The sorted keys start with the one ending at this node, if there is one
+        if len(keys[0][0]) == depth:
+            if keys[0][1]:
+                patterns.append(tuple(prefix.split(SEPARATOR, 1)))
+            keys = keys[1:]
+        for _, children in groupby(keys, key=lambda item: item[0][depth]):
+            patterns.extend(self._cover(list(children), depth + 1))
+        return patterns
+
+    def compile(self, tables: Iterable[tuple[str, str]], action: Literal["include", "exclude"]) -> list[TableMapping]:
+        """
+        :param tables: Tables of the universe the rules have to match
+        :param action: Action of the compiled rules
+        :return: Wildcard rules matching exactly ``tables`` within the universe
+        """
+        targets = set(tables) & self.universe
+        if not targets:
+            return []
+        explicit = [TableMapping(schema=schema, table=table, action=action) for schema, table in sorted(targets)]
+        if not self.wildcards:
+            return explicit
+        compiled = [
+            TableMapping(schema=schema, table=table, action=action)
+            for schema, table in self._cover(
+                sorted((f"{schema}{SEPARATOR}{table}", (schema, table) in targets) for schema, table in self.universe),
+                depth=0,
+            )
+        ]
+        if action == "exclude":
+            selected = select_tables([TableMapping(schema="%", table="%", action="include"), *compiled], self.universe)
+        else:
+            selected = select_tables(compiled, self.universe)
+        expected = targets if action == "include" else self.universe - targets
+        if selected != expected:
+            self.logger.warning(
+                "Compiled %s rules select %s tables instead of %s, keeping %s explicit rules",
+                action,
+                len(selected),
+                len(expected),
+                len(explicit),
+            )
+            return explicit
+
+        if len(compiled) < len(explicit):
+            self.logger.info(
+                "%s %s rules compiled into %s, table mappings %s -> %s bytes",
+                len(explicit),
+                action,
+                len(compiled),
+                len(json.dumps(get_table_mappings_rules(explicit))),
+                len(json.dumps(get_table_mappings_rules(compiled))),
+            )
+        return compiled
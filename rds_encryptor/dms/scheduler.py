@@ -0,0 +1,129 @@
+import time
+
+from botocore.exceptions import BotoCoreError, ClientError
+
+from rds_encryptor.dms.replication_instance import ReplicationInstance
+from rds_encryptor.utils import get_logger
+
+# Concurrent full loads a replication instance of the given size handles without swapping,
+# assuming the default 8 subtasks per task.
+INSTANCE_SIZE_TASK_SLOTS = {
+    "micro": 1,
+    "small": 1,
+    "medium": 1,
+    "large": 2,
+    "xlarge": 3,
+    "2xlarge": 6,
+    "4xlarge": 12,
+    "8xlarge": 24,
+    "9xlarge": 27,
+    "12xlarge": 36,
+    "16xlarge": 48,
+    "18xlarge": 54,
+    "24xlarge": 72,
+}
+INSTANCE_SIZE_VCPUS = {
+    "micro": 1,
+    "small": 1,
+    "medium": 1,
+    "large": 2,
+    "xlarge": 4,
+    "2xlarge": 8,
+    "4xlarge": 16,
+    "8xlarge": 32,
+    "9xlarge": 36,
+    "12xlarge": 48,
+    "16xlarge": 64,
+    "18xlarge": 72,
+    "24xlarge": 96,
+}
+# Compute optimized and burstable classes have less memory per vCPU than memory optimized ones
+LOW_MEMORY_FAMILIES = ("c", "t")
+
+
+def get_task_slots(instance_class: str) -> int:
+    """
+    :param instance_class: Replication instance class, e.g. "dms.r5.xlarge"
+    """
+    _, family, size = instance_class.split(".")
+    slots = INSTANCE_SIZE_TASK_SLOTS.get(size, 1)
+    if family.startswith(LOW_MEMORY_FAMILIES):
+        slots //= 2
+    return max(slots, 1)
+
+
+def get_instance_vcpus(instance_class: str) -> int:
+    """
+    :param instance_class: Replication instance class, e.g. "dms.r5.xlarge"
+    """
+    _, _, size = instance_class.split(".")
+    return INSTANCE_SIZE_VCPUS.get(size, 1)
+
+
+class CapacityScheduler:
+    """
+    Decides whether one more migration task may start on a replication instance.
+
+    The number of running tasks is capped by the instance class (or ``max_concurrent_tasks``), and
+    no task starts while CloudWatch reports low freeable memory, swapping or a saturated CPU.
+    """
+
+    logger = get_logger("CapacityScheduler")
+
+    def __init__(
+        self,
+        replication_instance: ReplicationInstance,
+        max_concurrent_tasks: int | None = None,
+        min_freeable_memory: int = 1024**3,
+        max_swap_usage: int = 256 * 1024**2,
+        max_cpu_utilization: float = 90,
+        metrics_ttl: float = 60,
+    ):
+        self.replication_instance = replication_instance
+        self.min_freeable_memory = min_freeable_memory
+        self.max_swap_usage = max_swap_usage
+        self.max_cpu_utilization = max_cpu_utilization
+        self.metrics_ttl = metrics_ttl
+        self._metrics: dict[str, float] = {}
+        self._metrics_at = 0.0
+
+        if max_concurrent_tasks is None:
+            instance_class = replication_instance.get_instance_class()
+            max_concurrent_tasks = get_task_slots(instance_class)
+            self.logger.info(
+                'Replication instance class "%s" allows %s concurrent tasks', instance_class, max_concurrent_tasks
+            )
+        self.max_concurrent_tasks = max_concurrent_tasks
+
+    def _get_metrics(self) -> dict[str, float]:
+        if time.monotonic() - self._metrics_at > self.metrics_ttl:
+            try:
+                self._metrics = self.replication_instance.get_metrics()
+            except (BotoCoreError, ClientError) as e:
+                self.logger.warning("Cannot read replication instance metrics, relying on task slots only: %s", e)
+                self._metrics = {}
+            self._metrics_at = time.monotonic()
+        return self._metrics
+
+    def can_start(self, running: int) -> bool:
+        if running >= self.max_concurrent_tasks:
+            return False
+        if running == 0:
+            return True
+
+        metrics = self._get_metrics()
+        freeable_memory = metrics.get("FreeableMemory")
+        swap_usage = metrics.get("SwapUsage")
+        cpu_utilization = metrics.get("CPUUtilization")
+        if freeable_memory is not None and freeable_memory < self.min_freeable_memory:
+            self.logger.info(
+                "Replication instance freeable memory is %.0f MiB, delaying next task", freeable_memory / 1024**2
+            )
+            return False
+        if swap_usage is not None and swap_usage > self.max_swap_usage:
+            self.logger.info("Replication instance swap usage is %.0f MiB, delaying next task", swap_usage / 1024**2)
+            return False
+        if cpu_utilization is not None and cpu_utilization > self.max_cpu_utilization:
+            self.logger.info("Replication instance CPU utilization is %.0f%%, delaying next task", cpu_utilization)
+            return False
+        return True
@@ -0,0 +1,108 @@
+import heapq
+import math
+from typing import NamedTuple
+
+from rds_encryptor.catalog import CatalogSnapshot, CatalogTable, get_heartbeat_table
+from rds_encryptor.dms.enums import MigrationType
+from rds_encryptor.dms.migration_task import TableMapping, TableSettings
+from rds_encryptor.dms.table_mappings import get_rule_compiler, get_table_mappings
+
+
+class TaskShard(NamedTuple):
+    index: int
+    tables: list[CatalogTable]
+    size_bytes: int
+    # The default shard selects tables with wildcards, so it also picks up tables created after planning,
+    # DMS control tables and the heartbeat tables no other shard replicates
+    default: bool
+
+    @property
+    def table_names(self) -> set[tuple[str, str]]:
+        return {(table.schema, table.name) for table in self.tables}
+
+
+def plan_shards(catalog: CatalogSnapshot, max_shards: int, shard_bytes: int) -> list[TaskShard]:
+    """
+    Splits the tables of one database into up to ``max_shards`` migration tasks of about ``shard_bytes`` each.
+
+    Tables larger than ``shard_bytes`` get a task of their own, the remaining tables are bin-packed largest
+    first into the task with the least data so far, which keeps the tasks balanced by total bytes.
+    """
+    # DMS loads leaf partitions, partitioned parents hold no rows
+    tables = sorted(
+        (table for table in catalog.user_tables if not table.is_partitioned),
+        key=lambda table: table.size_bytes,
+        reverse=True,
+    )
+    total_bytes = sum(table.size_bytes for table in tables)
+    count = max(min(max_shards, math.ceil(total_bytes / shard_bytes), len(tables)), 1)
+    if count == 1:
+        return [TaskShard(index=0, tables=tables, size_bytes=total_bytes, default=True)]
+
+    # At least one task is left for the tables that are not isolated
+    isolated = [table for table in tables if table.size_bytes >= shard_bytes][: count - 1]
+    bins: list[list[CatalogTable]] = [[] for _ in range(count - len(isolated))]
+    heap = [(0, idx) for idx in range(len(bins))]
+    for table in tables[len(isolated) :]:
+        size_bytes, idx = heapq.heappop(heap)
+        bins[idx].append(table)
+        heapq.heappush(heap, (size_bytes + table.size_bytes, idx))
+
+    groups = [*bins, *([table] for table in isolated)]
+    return [
+        TaskShard(
+            index=idx,
+            tables=group,
+            size_bytes=sum(table.size_bytes for table in group),
+            default=idx == 0,
+        )
+        for idx, group in enumerate(groups)
+    ]
+
+
+def _get_heartbeat_table_mapping(shard: TaskShard) -> TableMapping:
+    schema, table = get_heartbeat_table(shard.index).split(".", 1)
+    return TableMapping(schema=schema, table=table, action="include")
+
+
+def get_shards_table_mappings(
+    catalog: CatalogSnapshot, shards: list[TaskShard], migration_type: MigrationType
+) -> dict[int, list[TableMapping]]:
+    """
+    Selection rules per shard index: the tables of the shard, or for the default shard every table except
+    the ones other shards migrate. The default shard excludes exactly the rules other shards include, so
+    no table is migrated twice, and tables created during replication are migrated by the default shard.
+    Every other shard also replicates the heartbeat table of its index, so replication lag is measured
+    through each task.
+    """
+    compiler = get_rule_compiler(catalog, migration_type)
+    includes = {
+        shard.index: [
+            *compiler.compile(shard.table_names, action="include"),
+            _get_heartbeat_table_mapping(shard),
+        ]
+        for shard in shards
+        if not shard.default
+    }
+    mappings = {}
+    for shard in shards:
+        if shard.default:
+            mappings[shard.index] = [
+                *get_table_mappings(catalog, migration_type, compiler),
+                *(rule._replace(action="exclude") for rules in includes.values() for rule in rules),
+            ]
+        else:
+            mappings[shard.index] = includes[shard.index]
+    return mappings
+
+
+def get_shard_table_settings(
+    table_settings: list[TableSettings], shards: list[TaskShard], shard: TaskShard
+) -> list[TableSettings]:
+    """
+    :return: Table settings of the tables the shard migrates
+    """
+    if shard.default:
+        other_tables = set().union(*(other.table_names for other in shards if not other.default))
+        return [rule for rule in table_settings if (rule.schema, rule.table) not in other_tables]
+    return [rule for rule in table_settings if (rule.schema, rule.table) in shard.table_names]
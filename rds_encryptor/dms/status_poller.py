@@ -0,0 +1,110 @@
+from collections.abc import Callable
+from threading import Event, Lock, Thread
+
+from rds_encryptor.dms.migration_task import MigrationTask, TaskState
+from rds_encryptor.utils import get_logger
+
+# DMS accepts a limited number of values per describe filter
+FILTER_VALUES_LIMIT = 50
+
+
+TaskStateListener = Callable[[MigrationTask, TaskState | None, TaskState], None]
+
+
+class TaskStatusPoller:
+    """
+    Polls status of all tracked migration tasks with one filtered ``describe_replication_tasks``
+    call per interval (per page of ``FILTER_VALUES_LIMIT`` tasks) and sends every state change
+    to the registered listeners from the polling thread.
+    """
+
+    logger = get_logger("TaskStatusPoller")
+
+    def __init__(self, pooling_frequency: int = 30):
+        self.pooling_frequency = pooling_frequency
+        self._tasks: dict[str, MigrationTask] = {}
+        self._states: dict[str, TaskState] = {}
+        self._listeners: list[TaskStateListener] = []
+        self._lock = Lock()
+        self._stopped = Event()
+        self._wakeup = Event()
+        self._thread: Thread | None = None
+
+    def track(self, task: MigrationTask) -> None:
+        with self._lock:
+            self._tasks[task.arn] = task
+
+    def untrack(self, task: MigrationTask) -> None:
+        with self._lock:
+            self._tasks.pop(task.arn, None)
+            self._states.pop(task.arn, None)
+
+    def add_listener(self, listener: TaskStateListener) -> None:
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: TaskStateListener) -> None:
+        self._listeners.remove(listener)
+
+    def get_state(self, task: MigrationTask) -> TaskState | None:
+        with self._lock:
+            return self._states.get(task.arn)
+
+    def _describe_all(self, arns: list[str]) -> list[dict]:
+        descriptions = []
+        for offset in range(0, len(arns), FILTER_VALUES_LIMIT):
+            kwargs = {
+                "Filters": [{"Name": "replication-task-arn", "Values": arns[offset : offset + FILTER_VALUES_LIMIT]}]
+            }
+            while True:
+                response = MigrationTask.aws_client.describe_replication_tasks(**kwargs, WithoutSettings=True)
+                descriptions.extend(response["ReplicationTasks"])
+                if not response.get("Marker"):
+                    break
+                kwargs["Marker"] = response["Marker"]
+        return descriptions
+
+    def poll(self) -> None:
+        with self._lock:
+            tasks = dict(self._tasks)
+        if not tasks:
+            return
+
+        for description in self._describe_all(list(tasks)):
+            task = tasks.get(description["ReplicationTaskArn"])
+            if task is None:
+                continue
+            state = TaskState.from_description(description)
+            with self._lock:
+                previous = self._states.get(task.arn)
+                self._states[task.arn] = state
+            if state == previous:
+                continue
+            self.logger.debug("Task %s changed state from %s to %s", task.task_id, previous, state)
+            for listener in self._listeners:
+                listener(task, previous, state)
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                self.poll()
+            except Exception:
+                self.logger.exception("Cannot poll replication tasks status")
+            self._wakeup.wait(self.pooling_frequency)
+            self._wakeup.clear()
+
+    def wakeup(self) -> None:
+        """Polls as soon as possible, e.g. right after a task was started."""
+        self._wakeup.set()
+
+    def start(self) -> "TaskStatusPoller":
+        self._stopped.clear()
+        self._thread = Thread(target=self._run, name="dms-status-poller", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
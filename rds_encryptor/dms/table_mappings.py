@@ -0,0 +1,148 @@
+import math
+
+from rds_encryptor.catalog import CatalogSnapshot, CatalogTable
+from rds_encryptor.db_manager import DBManager
+from rds_encryptor.dms.enums import MigrationType
+from rds_encryptor.dms.migration_task import TableMapping, TableSettings
+from rds_encryptor.dms.rule_compiler import RuleCompiler, select_tables
+from rds_encryptor.rds.instance import RDSInstance
+from rds_encryptor.utils import get_logger
+
+# Segments of one table are loaded by full load subtasks, more of them only queue up
+MAX_PARALLEL_LOAD_SEGMENTS = 16
+
+
+SYSTEM_TABLE_MAPPINGS = [
+    TableMapping(schema="%", table="%", action="include"),
+    TableMapping(schema="pg_%", table="%", action="exclude"),
+    TableMapping(schema="information_schema", table="%", action="exclude"),
+    TableMapping(schema="pglogical", table="%", action="exclude"),
+]
+
+
+def get_replicated_tables(catalog: CatalogSnapshot) -> set[tuple[str, str]]:
+    """
+    :return: (schema, table) of every table ``SYSTEM_TABLE_MAPPINGS`` select, the universe per-table rules
+        are compiled against
+    """
+    return select_tables(SYSTEM_TABLE_MAPPINGS, ((table.schema, table.name) for table in catalog.tables.values()))
+
+
+def get_rule_compiler(catalog: CatalogSnapshot, migration_type: MigrationType) -> RuleCompiler:
+    """
+    Compiles per-table rules into wildcards for full load tasks only, tasks replicating changes would apply
+    the wildcards to tables created during the migration as well.
+    """
+    return RuleCompiler(get_replicated_tables(catalog), wildcards=migration_type == MigrationType.migrate)
+
+
+def get_table_mappings(
+    catalog: CatalogSnapshot,
+    migration_type: MigrationType,
+    compiler: RuleCompiler | None = None,
+) -> list[TableMapping]:
+    """
+    Selection rules for every user table of the database.
+
+    Because of the wildcards DMS migrates partitioned tables and their partitions as unrelated tables, which
+    loads every row twice and fails on unique constraints. Partitioned parents are excluded, so leaf
+    partitions are loaded and replicated as regular tables, PostgreSQL logs their changes under the leaf
+    partition names as well. Full load exclusions are compiled into wildcard rules, databases with thousands
+    of partitioned tables would exceed the TableMappings size limit otherwise.
+
+    :param compiler: ``get_rule_compiler`` of the catalog, to share it between calls
+    """
+    compiler = compiler or get_rule_compiler(catalog, migration_type)
+    return [
+        *SYSTEM_TABLE_MAPPINGS,
+        *compiler.compile(((table.schema, table.name) for table in catalog.partition_parents), action="exclude"),
+    ]
+
+
+def count_parallel_load_segments(table_settings: list[TableSettings]) -> int:
+    """
+    :return: Segments the parallel-load rules add on top of one per table
+    """
+    return sum(
+        len(rule.settings["parallel-load"].get("boundaries", []))
+        for rule in table_settings
+        if "parallel-load" in rule.settings
+    )
+
+
+class ParallelLoadPlanner:
+    """
+    Splits tables and leaf partitions larger than ``segment_bytes`` into primary key ranges, DMS loads
+    every range with its own thread (``parallel-load`` rule of type ``ranges``).
+
+    Boundaries come from a ``TABLESAMPLE SYSTEM`` sample of about ``sample_rows`` rows, so the segments
+    are roughly even without scanning the whole table. Tables without a primary key or row estimates
+    are loaded by one thread.
+    """
+
+    logger = get_logger("ParallelLoadPlanner")
+
+    def __init__(
+        self,
+        source_instance: RDSInstance,
+        database: str,
+        segment_bytes: int = 5 * 1024**3,
+        max_segments: int = MAX_PARALLEL_LOAD_SEGMENTS,
+        sample_rows: int = 100_000,
+    ):
+        self.db_manager = DBManager.from_rds(rds_instance=source_instance, database=database)
+        self.database = database
+        self.segment_bytes = segment_bytes
+        self.max_segments = max_segments
+        self.sample_rows = sample_rows
+
+    def get_segment_count(self, table: CatalogTable) -> int:
+        return max(min(math.ceil(table.size_bytes / self.segment_bytes), self.max_segments), 1)
+
+    def plan_table(self, table: CatalogTable) -> TableSettings | None:
+        segments = self.get_segment_count(table)
+        sample_percent = None
+        if table.estimated_rows > self.sample_rows:
+            sample_percent = 100 * self.sample_rows / table.estimated_rows
+        step = max(min(table.estimated_rows, self.sample_rows) // segments, 1)
+        boundaries = self.db_manager.get_key_boundaries(
+            table.qualified_name, list(table.primary_key), step, sample_percent=sample_percent
+        )[: segments - 1]
+        if not boundaries:
+            return None
+        return TableSettings(
+            schema=table.schema,
+            table=table.name,
+            settings={
+                "parallel-load": {
+                    "type": "ranges",
+                    "columns": list(table.primary_key),
+                    "boundaries": [[str(value) for value in key] for key in boundaries],
+                }
+            },
+        )
+
+    def plan(self) -> list[TableSettings]:
+        tables = [
+            table
+            for table in self.db_manager.catalog.user_tables
+            if not table.is_partitioned
+            and table.primary_key
+            and table.estimated_rows > 0
+            and self.get_segment_count(table) > 1
+        ]
+        table_settings = []
+        for table in tables:
+            rule = self.plan_table(table)
+            if rule is None:
+                continue
+            table_settings.append(rule)
+            self.logger.info(
+                '"%s" database table "%s" (%.1f GiB%s) is loaded in %s segments',
+                self.database,
+                table.qualified_name,
+                table.size_bytes / 1024**3,
+                f", partition of {table.parent}" if table.parent else "",
+                len(rule.settings["parallel-load"]["boundaries"]) + 1,
+            )
+        return table_settings
@@ -1,50 +1,257 @@
-from threading import Thread
+import time
+from collections.abc import Callable
+from queue import Empty, Queue
 
-from rds_encryptor.dms.migration_task import MigrationTask, TaskFailedException
+from rds_encryptor.dms.enums import ReplicationTaskStatus
+from rds_encryptor.dms.migration_task import MigrationTask, TableStatistics, TaskFailedException, TaskState
+from rds_encryptor.dms.scheduler import CapacityScheduler
+from rds_encryptor.dms.status_poller import TaskStatusPoller
 from rds_encryptor.utils import get_logger
 
 
 class MigrationTaskManager:
     logger = get_logger("MigrationTaskManager")
 
-    def __init__(self):
-        self.tasks: list["MigrationTask"] = []
+    def __init__(
+        self,
+        poller: TaskStatusPoller | None = None,
+        scheduler: CapacityScheduler | None = None,
+        timeout: int = 4 * 60 * 60,
+        scheduling_interval: int = 60,
+    ):
+        self.tasks: list[MigrationTask] = []
+        self.task_sizes: dict[str, int] = {}
+        self.task_groups: dict[str, str] = {}
         self.errors = []
+        self.failed_tasks: set[str] = set()
+        self.poller = poller or TaskStatusPoller()
+        self.scheduler = scheduler
+        self.timeout = timeout
+        self.scheduling_interval = scheduling_interval
 
-    def add_task(self, task: "MigrationTask"):
+    def add_task(self, task: "MigrationTask", size_bytes: int = 0, group: str | None = None):
+        """
+        :param size_bytes: Amount of data the task migrates, bigger tasks are started first
+        :param group: Logical migration the task belongs to, e.g. the database it migrates
+        """
         self.tasks.append(task)
+        self.task_sizes[task.arn] = size_bytes
+        if group is not None:
+            self.task_groups[task.arn] = group
+
+    def get_group_tasks(self, group: str) -> list[MigrationTask]:
+        return [task for task in self.tasks if self.task_groups.get(task.arn) == group]
+
+    def _log_group_results(self) -> None:
+        """Reports groups migrated by several tasks, e.g. shards of one database, as one migration."""
+        for group in dict.fromkeys(self.task_groups.values()):
+            tasks = self.get_group_tasks(group)
+            if len(tasks) < 2:
+                continue
+            failed = [task.task_id for task in tasks if task.arn in self.failed_tasks]
+            if failed:
+                self.logger.error(
+                    'Migration of "%s" failed in %s of %s tasks: %s', group, len(failed), len(tasks), ", ".join(failed)
+                )
+            else:
+                self.logger.info('Migration of "%s" finished in all %s tasks', group, len(tasks))
+
+    def _on_task_failed(self, task: MigrationTask, e: TaskFailedException):
+        self.errors.append(e)
+        self.failed_tasks.add(task.arn)
+        self.logger.error(
+            'Database migration task "%s" with status %s because "%s" with last failure message "%s"',
+            task.task_id,
+            e.status,
+            e.stop_reason,
+            e.last_failure_message,
+        )
+
+    def _on_task_timeout(self, task: MigrationTask):
+        e = TimeoutError(f"Task {task.task_id} is not finished after {self.timeout} seconds")
+        self.errors.append(e)
+        self.failed_tasks.add(task.arn)
+        self.logger.error(
+            "[Task %s] Timeout error: %s. Task might be still running, if so, please increase timeout and try again.",
+            task.task_id,
+            e,
+        )
+
+    def _handle_state(self, task: MigrationTask, state: TaskState, ready: set[str], running: dict[str, float]) -> bool:
+        """
+        Tracks ready tasks and checks running ones.
+
+        :return: True when the task does not need to be tracked anymore
+        """
+        if task.arn not in running:
+            if state.status == ReplicationTaskStatus.READY:
+                ready.add(task.arn)
+                return False
+            if state.status == ReplicationTaskStatus.FAILED:
+                self._on_task_failed(
+                    task,
+                    TaskFailedException(
+                        task=task,
+                        status=state.status,
+                        stop_reason=state.stop_reason,
+                        last_failure_message=state.last_failure_message,
+                    ),
+                )
+                return True
+            self.logger.debug("Task %s is in status %s, waiting...", task.task_id, state.status)
+            return False
 
-    def run_task(self, task: "MigrationTask"):
         try:
-            self.logger.info('Starting database migration task "%s" ...', task.task_id)
-            task.wait_until_ready().run_task().wait_until_finished()
-            self.logger.info('Database migration task "%s" finished successfully', task.task_id)
+            if task.check_finished(state):
+                self.logger.info('Database migration task "%s" finished successfully', task.task_id)
+                return True
         except TaskFailedException as e:
-            self.errors.append(e)
-            self.logger.error(
-                'Database migration task "%s" with status %s because "%s" with last failure message "%s"',
-                task.task_id,
-                e.status,
-                e.stop_reason,
-                e.last_failure_message,
-            )
-        except TimeoutError as e:
-            self.errors.append(e)
-            self.logger.error(
-                "[Task %s] Timeout error: %s. "
-                "Task might be still running, if so, please increase timeout and try again.",
-                task.task_id,
-                e,
-            )
+            self._on_task_failed(task, e)
+            return True
+        self.logger.info(
+            "[Task %s] Task status: %s, full load progress %s/100 waiting...",
+            task.task_id,
+            state.status,
+            state.full_load_progress,
+        )
+        return False
+
+    def _start_ready_tasks(self, pending: dict[str, MigrationTask], ready: set[str], running: dict[str, float]) -> None:
+        """
+        :param running: Deadline of every running task by arn, ``timeout`` seconds after it was started
+        """
+        queued = sorted(
+            (task for arn, task in pending.items() if arn in ready and arn not in running),
+            key=lambda task: self.task_sizes.get(task.arn, 0),
+            reverse=True,
+        )
+        for task in queued:
+            if self.scheduler is not None and not self.scheduler.can_start(len(running)):
+                self.logger.debug("%s tasks running, %s waiting for capacity", len(running), len(queued))
+                return
+            self.logger.info('Starting database migration task "%s" ...', task.task_id)
+            task.run_task()
+            running[task.arn] = time.monotonic() + self.timeout
+            self.poller.wakeup()
+
+    def recover_tables(
+        self,
+        mismatched: dict[str, list[str]] | None = None,
+        before_reload: Callable[[MigrationTask, list[str]], None] | None = None,
+    ) -> dict[str, list[str]]:
+        """
+        Reloads failed or suspended tables, and tables with mismatched data, in their running tasks
+        instead of repeating the full load of the whole task.
+
+        :param mismatched: Qualified names of tables with mismatched data per task group
+        :param before_reload: Called with the task and the tables it is about to reload, e.g. to empty
+            them on the target, as reloads load on top of the rows already there
+        :return: Tables that failed again after the reload, per task id
+        """
+        reloaded: dict[MigrationTask, list[TableStatistics]] = {}
+        for task in self.tasks:
+            statistics = task.get_table_statistics()
+            wanted = set(mismatched.get(self.task_groups.get(task.arn), [])) if mismatched else set()
+            tables = [table for table in statistics if table.is_failed or table.qualified_name in wanted]
+            if not tables:
+                continue
+            if task.get_status() != ReplicationTaskStatus.RUNNING:
+                self.logger.warning("[Task %s] Cannot reload %s tables, task is not running", task.task_id, len(tables))
+                continue
+            if before_reload is not None:
+                before_reload(task, [table.qualified_name for table in tables])
+            task.reload_tables([table.qualified_name for table in tables])
+            reloaded[task] = tables
+
+        failed: dict[str, list[str]] = {}
+        for task, tables in reloaded.items():
+            failed_again = task.wait_until_tables_loaded(tables, timeout=self.timeout)
+            if failed_again:
+                failed[task.task_id] = [table.qualified_name for table in failed_again]
+                self.logger.error(
+                    "[Task %s] %s tables failed again after reload: %s",
+                    task.task_id,
+                    len(failed_again),
+                    ", ".join(failed[task.task_id]),
+                )
+            else:
+                self.logger.info("[Task %s] %s tables reloaded successfully", task.task_id, len(tables))
+        return failed
+
+    def stop_all(self) -> None:
+        """
+        Stops every running task, e.g. before the replication slots the tasks read from are dropped.
+        """
+        stopping = []
+        for task in self.tasks:
+            if task.get_status() in (ReplicationTaskStatus.STARTING, ReplicationTaskStatus.RUNNING):
+                task.stop_task()
+                stopping.append(task)
+        for task in stopping:
+            task.wait_until_stopped()
 
     def run_all(self) -> bool:
+        """
+        Starts tasks largest first as soon as they are ready and the scheduler has capacity for them.
+        A slot is freed when a task completes its full load, fails, stops or times out.
+
+        Every task times out ``timeout`` seconds after it was started, time spent waiting for capacity does not
+        count. Tasks that do not become ready time out ``timeout`` seconds after this call.
+        """
         self.errors = []
-        threads = []
+        self.failed_tasks = set()
+        pending = {task.arn: task for task in self.tasks}
+        ready: set[str] = set()
+        running: dict[str, float] = {}
+        events: Queue[tuple[MigrationTask, TaskState]] = Queue()
+
+        def listener(task: MigrationTask, _previous: TaskState | None, state: TaskState) -> None:
+            events.put((task, state))
+
+        self.poller.add_listener(listener)
         for task in self.tasks:
-            thread = Thread(target=self.run_task, args=(task,))
-            thread.start()
-            threads.append(thread)
-        for thread in threads:
-            thread.join()
+            self.logger.info('Waiting for database migration task "%s" to be ready ...', task.task_id)
+            self.poller.track(task)
+        self.poller.start()
+
+        ready_deadline = time.monotonic() + self.timeout
+
+        def get_deadline(arn: str) -> float | None:
+            if arn in running:
+                return running[arn]
+            return None if arn in ready else ready_deadline
+
+        try:
+            while pending:
+                now = time.monotonic()
+                # Tasks waiting for capacity have no deadline
+                deadlines = {arn: deadline for arn in pending if (deadline := get_deadline(arn)) is not None}
+                timed_out = [arn for arn, deadline in deadlines.items() if deadline <= now]
+                for arn in timed_out:
+                    task = pending.pop(arn)
+                    running.pop(arn, None)
+                    self.poller.untrack(task)
+                    self._on_task_timeout(task)
+                if timed_out:
+                    self._start_ready_tasks(pending, ready, running)
+                    continue
+                remaining = min(deadlines.values(), default=now + self.scheduling_interval) - now
+                try:
+                    task, state = events.get(timeout=min(remaining, self.scheduling_interval))
+                except Empty:
+                    # Re-check capacity of the replication instance for tasks waiting to start
+                    self._start_ready_tasks(pending, ready, running)
+                    continue
+                if task.arn in pending and self._handle_state(task, state, ready, running):
+                    pending.pop(task.arn)
+                    running.pop(task.arn, None)
+                    self.poller.untrack(task)
+                self._start_ready_tasks(pending, ready, running)
+        finally:
+            self.poller.stop()
+            self.poller.remove_listener(listener)
+            for task in self.tasks:
+                self.poller.untrack(task)
 
+        self._log_group_results()
         return not self.errors
@@ -0,0 +1,137 @@
+import statistics
+from typing import NamedTuple
+
+from rds_encryptor.catalog import CatalogSnapshot, CatalogTable
+from rds_encryptor.dms.migration_task import DEFAULT_REPLICATE_TASK_SETTINGS, get_task_settings
+from rds_encryptor.dms.scheduler import LOW_MEMORY_FAMILIES, get_instance_vcpus
+
+# DMS does not accept more full load subtasks per task
+MAX_FULL_LOAD_SUBTASKS = 49
+MAX_COMMIT_RATE = 50_000
+MAX_PARALLEL_LOAD_THREADS = 16
+
+LARGE_TABLE_BYTES = 10 * 1024**3
+SMALL_TABLE_BYTES = 10 * 1024**2
+WIDE_ROW_BYTES = 8 * 1024
+# Rows modified per second above which changes are applied in batches
+HIGH_WRITE_RATE = 1_000
+
+
+class WorkloadProfile(NamedTuple):
+    table_count: int
+    total_bytes: int
+    largest_table_bytes: int
+    median_table_bytes: int
+    estimated_rows: int
+    lob_table_count: int
+    tables_without_primary_key: int
+    writes_per_second: float
+
+    @classmethod
+    def from_catalog(cls, catalog: CatalogSnapshot, writes_per_second: float = 0.0) -> "WorkloadProfile":
+        """
+        Profiles the tables DMS loads, partitioned parents are skipped because their leaf partitions
+        are loaded as regular tables.
+        """
+        return cls.from_tables(
+            [table for table in catalog.user_tables if not table.is_partitioned], writes_per_second=writes_per_second
+        )
+
+    @classmethod
+    def from_tables(cls, tables: list[CatalogTable], writes_per_second: float = 0.0) -> "WorkloadProfile":
+        sizes = [table.size_bytes for table in tables] or [0]
+        return cls(
+            table_count=len(tables),
+            total_bytes=sum(sizes),
+            largest_table_bytes=max(sizes),
+            median_table_bytes=int(statistics.median(sizes)),
+            estimated_rows=sum(max(table.estimated_rows, 0) for table in tables),
+            lob_table_count=sum(1 for table in tables if table.lob_columns),
+            tables_without_primary_key=sum(1 for table in tables if not table.primary_key),
+            writes_per_second=writes_per_second,
+        )
+
+    @property
+    def average_row_bytes(self) -> float | None:
+        return self.total_bytes / self.estimated_rows if self.estimated_rows else None
+
+    @property
+    def lob_ratio(self) -> float:
+        return self.lob_table_count / self.table_count if self.table_count else 0.0
+
+
+def tune_task_settings(
+    profile: WorkloadProfile,
+    instance_class: str,
+    enable_validation: bool = True,
+    idempotent_apply: bool = False,
+    lob_max_size_kb: int | None = None,
+    parallel_load_segments: int = 0,
+) -> dict:
+    """
+    Adjusts the default task settings to the size and shape of one database and the replication instance.
+
+    :param profile: Workload profile of the source database
+    :param instance_class: Replication instance class, e.g. "dms.r5.xlarge"
+    :param enable_validation: Enables DMS row-level validation
+    :param idempotent_apply: Applies changes the target already has as upserts
+    :param lob_max_size_kb: Limited LOB mode size measured on the source, keeps the default when not profiled
+    :param parallel_load_segments: Extra segments of tables split by parallel-load rules, each one takes a subtask
+    """
+    settings = get_task_settings(enable_validation=enable_validation, idempotent_apply=idempotent_apply)
+    full_load = settings["FullLoadSettings"]
+    target_metadata = settings["TargetMetadata"]
+    stream_buffer = settings["StreamBufferSettings"]
+    change_processing = settings["ChangeProcessingTuning"]
+
+    vcpus = get_instance_vcpus(instance_class)
+    _, family, _ = instance_class.split(".")
+    low_memory = family.startswith(LOW_MEMORY_FAMILIES)
+
+    # Per-table overhead dominates the load of many small tables, so more of them run side by side
+    subtasks_per_vcpu = 4 if profile.median_table_bytes < SMALL_TABLE_BYTES else 2
+    full_load["MaxFullLoadSubTasks"] = max(
+        min(profile.table_count + parallel_load_segments, vcpus * subtasks_per_vcpu, MAX_FULL_LOAD_SUBTASKS), 1
+    )
+
+    average_row_bytes = profile.average_row_bytes
+    if profile.lob_ratio > 0.5 or (average_row_bytes is not None and average_row_bytes > WIDE_ROW_BYTES):
+        # Wide rows and LOBs are buffered in memory until commit
+        full_load["CommitRate"] = 5_000
+    elif profile.largest_table_bytes >= LARGE_TABLE_BYTES and not low_memory:
+        full_load["CommitRate"] = MAX_COMMIT_RATE
+
+    if profile.largest_table_bytes >= LARGE_TABLE_BYTES:
+        # A few huge tables cannot be spread across subtasks, so each one is loaded by several threads
+        target_metadata["ParallelLoadThreads"] = min(vcpus, MAX_PARALLEL_LOAD_THREADS)
+        target_metadata["ParallelLoadBufferSize"] = 500
+
+    if profile.total_bytes >= LARGE_TABLE_BYTES or profile.lob_table_count:
+        stream_buffer["StreamBufferSizeInMB"] = 16 if low_memory or vcpus < 8 else 32
+
+    if lob_max_size_kb is not None:
+        target_metadata["LobMaxSize"] = lob_max_size_kb
+
+    # Batch apply needs a primary key on every table, otherwise changes are applied one by one anyway
+    if profile.writes_per_second >= HIGH_WRITE_RATE and not profile.tables_without_primary_key:
+        target_metadata["BatchApplyEnabled"] = True
+        change_processing["BatchApplyMemoryLimit"] = 1000 if not low_memory else 500
+        change_processing["MemoryLimitTotal"] = 2048 if not low_memory else 1024
+
+    return settings
+
+
+def diff_task_settings(settings: dict, defaults: dict = DEFAULT_REPLICATE_TASK_SETTINGS) -> dict:
+    """
+    :return: Flat {"Section.Setting": value} mapping of settings that differ from ``defaults``
+    """
+    diff = {}
+    for section, values in settings.items():
+        default_values = defaults.get(section)
+        if isinstance(values, dict) and isinstance(default_values, dict):
+            diff.update(
+                {f"{section}.{name}": value for name, value in values.items() if default_values.get(name) != value}
+            )
+        elif values != default_values:
+            diff[section] = values
+    return diff
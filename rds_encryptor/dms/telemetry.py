@@ -0,0 +1,198 @@
+import json
+import time
+from datetime import UTC, datetime
+from pathlib import Path
+from threading import Event, Lock, Thread
+from typing import NamedTuple
+
+from rds_encryptor.catalog import CatalogSnapshot
+from rds_encryptor.dms.enums import ReplicationTaskStatus
+from rds_encryptor.dms.migration_task import MigrationTask, TableStatistics
+from rds_encryptor.dms.status_poller import TaskStatusPoller
+from rds_encryptor.utils import get_logger
+
+
+class TableProgress(NamedTuple):
+    task_id: str
+    table: str
+    state: str
+    rows: int
+    expected_rows: int | None
+    rows_per_second: float | None
+    bytes_per_second: float | None
+    eta_seconds: float | None
+
+
+class TaskProgress(NamedTuple):
+    task_id: str
+    tables: int
+    loaded_bytes: int
+    expected_bytes: int
+    rows_per_second: float
+    bytes_per_second: float
+    eta_seconds: float | None
+    bottlenecks: list[str]
+
+
+class MigrationTelemetry:
+    """
+    Samples DMS table statistics of every running tracked task once per ``interval`` from a background thread.
+
+    Load rates come from the growth of ``FullLoadRows`` between two samples, bytes are derived from the
+    average row size of the source table and time remaining from the source table size. A summary per
+    task is logged, and every sample is appended to ``output_path`` as JSON lines when it is set.
+    Tasks are sampled once ``poller`` reports them running, a task failing to sample does not stop
+    the others.
+    """
+
+    logger = get_logger("MigrationTelemetry")
+
+    def __init__(
+        self,
+        poller: TaskStatusPoller,
+        output_path: str | None = None,
+        interval: int = 60,
+        bottlenecks: int = 3,
+    ):
+        self.poller = poller
+        self.output_path = Path(output_path) if output_path else None
+        self.interval = interval
+        self.bottlenecks = bottlenecks
+        self._tasks: dict[str, MigrationTask] = {}
+        self._catalogs: dict[str, CatalogSnapshot] = {}
+        # (task arn, table) -> (rows, monotonic time) of the previous sample
+        self._samples: dict[tuple[str, str], tuple[int, float]] = {}
+        self._lock = Lock()
+        self._stopped = Event()
+        self._thread: Thread | None = None
+
+    def track(self, task: MigrationTask, source_catalog: CatalogSnapshot) -> None:
+        with self._lock:
+            self._tasks[task.arn] = task
+            self._catalogs[task.arn] = source_catalog
+
+    def untrack(self, task: MigrationTask) -> None:
+        with self._lock:
+            self._tasks.pop(task.arn, None)
+            self._catalogs.pop(task.arn, None)
+
+    def _table_progress(
+        self, task: MigrationTask, catalog: CatalogSnapshot, statistics: TableStatistics, now: float
+    ) -> tuple[TableProgress, int, int]:
+        """
+        :return: Progress of the table, its loaded and expected size in bytes
+        """
+        source_table = catalog.tables.get(statistics.qualified_name)
+        expected_rows = max(source_table.estimated_rows, 0) if source_table else None
+        expected_bytes = source_table.size_bytes if source_table else 0
+        row_bytes = expected_bytes / expected_rows if expected_rows else None
+
+        rows_per_second = None
+        previous = self._samples.get((task.arn, statistics.qualified_name))
+        if previous is not None and now > previous[1]:
+            rows_per_second = max(statistics.full_load_rows - previous[0], 0) / (now - previous[1])
+        self._samples[(task.arn, statistics.qualified_name)] = (statistics.full_load_rows, now)
+
+        eta_seconds, loaded_bytes = None, 0
+        if statistics.state == "Table completed":
+            eta_seconds, loaded_bytes = 0.0, expected_bytes
+        else:
+            if rows_per_second and expected_rows:
+                eta_seconds = max(expected_rows - statistics.full_load_rows, 0) / rows_per_second
+            if row_bytes:
+                loaded_bytes = min(int(statistics.full_load_rows * row_bytes), expected_bytes)
+        progress = TableProgress(
+            task_id=task.task_id,
+            table=statistics.qualified_name,
+            state=statistics.state,
+            rows=statistics.full_load_rows,
+            expected_rows=expected_rows,
+            rows_per_second=rows_per_second,
+            bytes_per_second=rows_per_second * row_bytes if rows_per_second is not None and row_bytes else None,
+            eta_seconds=eta_seconds,
+        )
+        return progress, loaded_bytes, expected_bytes
+
+    def _task_progress(self, task: MigrationTask, catalog: CatalogSnapshot) -> tuple[TaskProgress, list[TableProgress]]:
+        now = time.monotonic()
+        tables, loaded_bytes, expected_bytes = [], 0, 0
+        for statistics in task.get_table_statistics():
+            progress, loaded, expected = self._table_progress(task, catalog, statistics, now)
+            tables.append(progress)
+            loaded_bytes += loaded
+            expected_bytes += expected
+
+        rows_per_second = sum(table.rows_per_second or 0 for table in tables)
+        bytes_per_second = sum(table.bytes_per_second or 0 for table in tables)
+        slowest = sorted(
+            (table for table in tables if table.eta_seconds),
+            key=lambda table: table.eta_seconds,
+            reverse=True,
+        )
+        task_progress = TaskProgress(
+            task_id=task.task_id,
+            tables=len(tables),
+            loaded_bytes=loaded_bytes,
+            expected_bytes=expected_bytes,
+            rows_per_second=rows_per_second,
+            bytes_per_second=bytes_per_second,
+            # Tables load in parallel, so the task is done when its slowest table is
+            eta_seconds=slowest[0].eta_seconds if slowest else None,
+            bottlenecks=[table.table for table in slowest[: self.bottlenecks]],
+        )
+        return task_progress, tables
+
+    def sample(self) -> list[TaskProgress]:
+        with self._lock:
+            tasks = [(task, self._catalogs[arn]) for arn, task in self._tasks.items()]
+
+        timestamp = datetime.now(tz=UTC).isoformat()
+        summaries, lines = [], []
+        for task, catalog in tasks:
+            state = self.poller.get_state(task)
+            if state is None or state.status != ReplicationTaskStatus.RUNNING:
+                continue
+            try:
+                task_progress, tables = self._task_progress(task, catalog)
+            except Exception:
+                self.logger.exception("[Task %s] Cannot sample replication task telemetry", task.task_id)
+                continue
+            summaries.append(task_progress)
+            lines.extend(json.dumps({"time": timestamp, "kind": "table", **table._asdict()}) for table in tables)
+            lines.append(json.dumps({"time": timestamp, "kind": "task", **task_progress._asdict()}))
+
+        if self.output_path is not None and lines:
+            with self.output_path.open("a") as file:
+                file.writelines(f"{line}\n" for line in lines)
+
+        for summary in summaries:
+            self.logger.info(
+                "[Task %s] %.1f/%.1f GiB loaded, %.0f rows/s, %.1f MiB/s, ETA %s, slowest tables: %s",
+                summary.task_id,
+                summary.loaded_bytes / 1024**3,
+                summary.expected_bytes / 1024**3,
+                summary.rows_per_second,
+                summary.bytes_per_second / 1024**2,
+                f"{summary.eta_seconds / 60:.0f}m" if summary.eta_seconds is not None else "unknown",
+                ", ".join(summary.bottlenecks) or "none",
+            )
+        return summaries
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            try:
+                self.sample()
+            except Exception:
+                self.logger.exception("Cannot sample replication tasks telemetry")
+
+    def start(self) -> "MigrationTelemetry":
+        self._stopped.clear()
+        self._thread = Thread(target=self._run, name="dms-telemetry", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -1,9 +1,25 @@
-from rds_encryptor.db_manager import DBManager
+import asyncio
+import time
+from collections import Counter
+from collections.abc import Generator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from rds_encryptor.async_db_manager import AsyncDBManager, gather_limited, run_blocking
+from rds_encryptor.aws import DescribeCache
+from rds_encryptor.db_manager import DBManager, PostgresDBManager
 from rds_encryptor.dms.endpoints import SourceEndpoint, TargetEndpoint
 from rds_encryptor.dms.enums import MigrationType
-from rds_encryptor.dms.migration_task import MigrationTask, TableMapping
+from rds_encryptor.dms.lob_profiler import LobPlan, LobProfiler, plan_lob_settings
+from rds_encryptor.dms.migration_task import MigrationTask, TableSettings
 from rds_encryptor.dms.replication_instance import ReplicationInstance
+from rds_encryptor.dms.scheduler import CapacityScheduler
+from rds_encryptor.dms.sharding import get_shard_table_settings, get_shards_table_mappings, plan_shards
+from rds_encryptor.dms.table_mappings import ParallelLoadPlanner, count_parallel_load_segments
 from rds_encryptor.dms.task_manager import MigrationTaskManager
+from rds_encryptor.dms.task_settings import WorkloadProfile, diff_task_settings, tune_task_settings
+from rds_encryptor.dms.telemetry import MigrationTelemetry
+from rds_encryptor.lag_monitor import LagMonitor
 from rds_encryptor.rds.instance import RDSInstance
 from rds_encryptor.rds.parameter_group import (
     ParameterGroup,
@@ -11,7 +27,13 @@ from rds_encryptor.rds.parameter_group import (
     get_migration_parameter_group_name,
     get_original_parameter_group,
 )
-from rds_encryptor.utils import MIGRATION_SEED, get_logger, normalize_aws_id
+from rds_encryptor.utils import MIGRATION_SEED, get_logger, get_replication_slot_name, normalize_aws_id
+from rds_encryptor.verification.content_hash import ChunkMismatch, ContentHashVerifier
+from rds_encryptor.verification.row_counts import ConsistencyStatus, RowCountVerifier, TableConsistency
+
+
+class CutoverFailedException(Exception):
+    pass
 
 
 class EncryptionPipeline:
@@ -25,6 +47,27 @@ class EncryptionPipeline:
         dms_replication_instance_arn: str,
         databases: list[str] = None,  # noqa: RUF013
         new_instance_identifier: str | None = None,
+        consistency_check_workers: int = 8,
+        consistency_tolerance: float = 0.0,
+        exact_consistency_check: bool = False,
+        content_verification: bool = False,
+        content_verification_progress_path: str | None = None,
+        sequence_margin: int = 0,
+        db_concurrency: int = 8,
+        max_concurrent_tasks: int | None = None,
+        table_recovery: bool = False,
+        telemetry_path: str | None = None,
+        telemetry_interval: int = 60,
+        max_replication_lag: float | None = None,
+        replication_lag_stable_seconds: float = 60,
+        cutover: bool = False,
+        cutover_switch_endpoints: bool = False,
+        cdc_from_snapshot: bool = False,
+        lob_profiling: bool = False,
+        parallel_load: bool = False,
+        parallel_load_segment_gb: float = 5,
+        max_tasks_per_database: int = 1,
+        shard_size_gb: float = 100,
     ):
         self.rds_instance = RDSInstance.from_id(instance_id=instance_id, root_password=master_password)
         if self.rds_instance is None:
@@ -36,14 +79,50 @@ class EncryptionPipeline:
         self.new_instance_identifier = new_instance_identifier or normalize_aws_id(
             f"{instance_id}-{MIGRATION_SEED}-encrypted"
         )
+        self.consistency_check_workers = consistency_check_workers
+        self.consistency_tolerance = consistency_tolerance
+        self.exact_consistency_check = exact_consistency_check
+        self.content_verification = content_verification
+        self.sequence_margin = sequence_margin
+        self.db_concurrency = db_concurrency
+        self.max_concurrent_tasks = max_concurrent_tasks
+        self.table_recovery = table_recovery
+        self.telemetry_interval = telemetry_interval
+        self.cutover = cutover
+        self.cdc_from_snapshot = cdc_from_snapshot
+        self.lob_profiling = lob_profiling
+        # Parallel load segments the full load, tasks replicating changes only have nothing to segment
+        self.parallel_load = parallel_load and not cdc_from_snapshot
+        self.parallel_load_segment_bytes = int(parallel_load_segment_gb * 1024**3)
+        # A replication slot serves one task, so CDC from snapshot keeps one task per database
+        self.max_tasks_per_database = 1 if cdc_from_snapshot else max_tasks_per_database
+        self.shard_bytes = int(shard_size_gb * 1024**3)
+        # Replication slot LSN per database, CDC-only tasks start from it
+        self.cdc_start_positions: dict[str, str] = {}
+        self.cutover_switch_endpoints = cutover_switch_endpoints
+        # Cutover needs the heartbeat table to know when the target caught up and drained. CDC-only tasks
+        # count as finished once running, so the heartbeat is the only sign the target caught up.
+        if (cutover or cdc_from_snapshot) and max_replication_lag is None:
+            max_replication_lag = 5
+        self.max_replication_lag = max_replication_lag
+        self.replication_lag_stable_seconds = replication_lag_stable_seconds
+        self.telemetry_path = telemetry_path
+        self.content_verification_progress_path = content_verification_progress_path or (
+            f"{normalize_aws_id(instance_id)}-{MIGRATION_SEED}-content-verification.json"
+        )
 
-    def check_databases_connections(self):
+    async def check_database_connection_async(self, database: str):
+        db_manager = AsyncDBManager.from_rds(rds_instance=self.rds_instance, database=database)
+        if not await db_manager.check_connection():
+            raise db_manager.invalid_credentials_exception(f"Cannot connect to source RDS to {database} database.")
+        self.logger.info('Successfully connected to "%s" database.', database)
+
+    async def check_databases_connections_async(self):
         self.logger.info("Checking database connections...")
-        for database in self.databases:
-            db_manager = DBManager.from_rds(rds_instance=self.rds_instance, database=database)
-            if not db_manager.check_connection():
-                raise db_manager.invalid_credentials_exception(f"Cannot connect to source RDS to {database} database.")
-            self.logger.info('Successfully connected to "%s" database.', database)
+        await gather_limited(self.databases, self.check_database_connection_async, self.db_concurrency)
+
+    def check_databases_connections(self):
+        asyncio.run(self.check_databases_connections_async())
 
     def create_encrypted_instance(self):
         self.logger.info('Trying to provision encrypted RDS instance with ID: "%s" ...', self.new_instance_identifier)
@@ -85,30 +164,30 @@ class EncryptionPipeline:
 
         if migration_parameter_group is None:
             migration_parameter_group: ParameterGroup = self.rds_instance.parameter_group.copy()
-        if migration_parameter_group.wal_sender_timeout != 0:
-            self.logger.info(
-                "%s.wal_sender_timeout=%s, setting to 0",
-                parameter_group_name,
-                migration_parameter_group.wal_sender_timeout,
-            )
-            migration_parameter_group.set_parameter("wal_sender_timeout", 0)
-        if "pglogical" not in migration_parameter_group.shared_preload_libraries:
-            self.logger.info(
-                "pglogical not in %s.shared_preload_libraries=%s, adding pglogical",
-                parameter_group_name,
-                migration_parameter_group.shared_preload_libraries,
-            )
-            migration_parameter_group.set_parameter(
-                "shared_preload_libraries",
-                build_shared_preload_libraries_param("pglogical", *migration_parameter_group.shared_preload_libraries),
-            )
-        if migration_parameter_group.rds_logical_replication != 1:
-            self.logger.info(
-                "%s.rds_logical_replication=%s, setting to 1",
-                parameter_group_name,
-                migration_parameter_group.rds_logical_replication,
-            )
-            migration_parameter_group.set_parameter("rds.logical_replication", 1)
+        with migration_parameter_group.batch_edit() as changes:
+            if migration_parameter_group.wal_sender_timeout != 0:
+                self.logger.info(
+                    "%s.wal_sender_timeout=%s, setting to 0",
+                    parameter_group_name,
+                    migration_parameter_group.wal_sender_timeout,
+                )
+                changes["wal_sender_timeout"] = 0
+            if "pglogical" not in migration_parameter_group.shared_preload_libraries:
+                self.logger.info(
+                    "pglogical not in %s.shared_preload_libraries=%s, adding pglogical",
+                    parameter_group_name,
+                    migration_parameter_group.shared_preload_libraries,
+                )
+                changes["shared_preload_libraries"] = build_shared_preload_libraries_param(
+                    "pglogical", *migration_parameter_group.shared_preload_libraries
+                )
+            if migration_parameter_group.rds_logical_replication != 1:
+                self.logger.info(
+                    "%s.rds_logical_replication=%s, setting to 1",
+                    parameter_group_name,
+                    migration_parameter_group.rds_logical_replication,
+                )
+                changes["rds.logical_replication"] = 1
 
         return migration_parameter_group
 
@@ -124,132 +203,494 @@ class EncryptionPipeline:
             )
             input()
 
-        for database in self.databases:
-            source_db_manager = DBManager.from_rds(rds_instance=self.rds_instance, database=database)
-            self.logger.info('Creating "pglogical" extension for %s database', database)
-            source_db_manager.create_extension("pglogical")
+        asyncio.run(self.create_pglogical_extensions_async())
 
-    def create_replication_tasks(self, encrypted_rds_instance: RDSInstance) -> MigrationTaskManager:
-        task_manager = MigrationTaskManager()
-        dms_replication_instance = ReplicationInstance.from_arn(arn=self.dms_replication_instance_arn)
+    async def create_pglogical_extension_async(self, database: str):
+        source_db_manager = AsyncDBManager.from_rds(rds_instance=self.rds_instance, database=database)
+        self.logger.info('Creating "pglogical" extension for %s database', database)
+        await source_db_manager.create_extension("pglogical")
+
+    async def create_pglogical_extensions_async(self):
+        await gather_limited(self.databases, self.create_pglogical_extension_async, self.db_concurrency)
+
+    async def get_workload_profile_async(self, database: str) -> WorkloadProfile:
+        db_manager = AsyncDBManager.from_rds(rds_instance=self.rds_instance, database=database)
+        catalog, writes_per_second = await asyncio.gather(db_manager.get_catalog(), db_manager.get_write_rate())
+        return WorkloadProfile.from_catalog(catalog, writes_per_second=writes_per_second)
+
+    async def get_workload_profiles_async(self) -> dict[str, WorkloadProfile]:
+        profiles = await gather_limited(self.databases, self.get_workload_profile_async, self.db_concurrency)
+        return dict(zip(self.databases, profiles, strict=True))
 
-        for database in self.databases:
-            encrypted_instance_db_manager = DBManager.from_rds(rds_instance=encrypted_rds_instance, database=database)
-
-            # Because of the wildcards DMS trying to migrate partitioned tables and partitions as regular tables,
-            # we get unique constraint violation, to prevent it we have to exclude partitioned tables
-            partitioned_tables = encrypted_instance_db_manager.get_partitioned_tables()
-            exclude_partitioned_tables = [
-                TableMapping(schema=table["schema"], table=table["table"], action="exclude")
-                for table in partitioned_tables
-            ]
-
-            source_endpoint = (
-                SourceEndpoint(self.rds_instance, database=database, kms_key_arn=self.kms_key_arn)
-                .get_or_create_endpoint()
-                .wait_until_created()
+    async def get_lob_plan_async(self, database: str) -> LobPlan:
+        profiler = LobProfiler(self.rds_instance, database=database)
+        plan = plan_lob_settings(await run_blocking(profiler.profile))
+        self.logger.info(
+            '"%s" database LOB plan: LobMaxSize %s KB, %s tables with own LOB settings',
+            database,
+            plan.lob_max_size_kb,
+            len(plan.table_settings),
+        )
+        return plan
+
+    async def get_lob_plans_async(self) -> dict[str, LobPlan]:
+        plans = await gather_limited(self.databases, self.get_lob_plan_async, self.db_concurrency)
+        return dict(zip(self.databases, plans, strict=True))
+
+    async def get_parallel_load_settings_async(self) -> dict[str, list[TableSettings]]:
+        async def plan(database: str) -> list[TableSettings]:
+            planner = ParallelLoadPlanner(
+                self.rds_instance, database=database, segment_bytes=self.parallel_load_segment_bytes
             )
-            target_endpoint = (
-                TargetEndpoint(
-                    encrypted_rds_instance,
-                    database=database,
-                    kms_key_arn=self.kms_key_arn,
-                )
-                .get_or_create_endpoint()
-                .wait_until_created()
+            return await run_blocking(planner.plan)
+
+        settings = await gather_limited(self.databases, plan, self.db_concurrency)
+        return dict(zip(self.databases, settings, strict=True))
+
+    def provision_replication_tasks(
+        self,
+        database: str,
+        encrypted_rds_instance: RDSInstance,
+        dms_replication_instance: ReplicationInstance,
+        instance_class: str,
+        profile: WorkloadProfile,
+        lob_plan: LobPlan | None = None,
+        parallel_load_settings: list[TableSettings] | None = None,
+    ) -> list[tuple[MigrationTask, int]]:
+        """
+        Provisions endpoints of the database and one migration task per shard of its tables.
+
+        :return: Migration tasks with the amount of data they migrate in bytes
+        """
+        source_catalog = DBManager.from_rds(rds_instance=self.rds_instance, database=database).catalog
+        table_settings = [*(lob_plan.table_settings if lob_plan else []), *(parallel_load_settings or [])]
+        shards = plan_shards(source_catalog, max_shards=self.max_tasks_per_database, shard_bytes=self.shard_bytes)
+        if len(shards) > 1:
+            self.logger.info(
+                '"%s" database is migrated by %s tasks: %s',
+                database,
+                len(shards),
+                ", ".join(f"{len(shard.tables)} tables {shard.size_bytes / 1024**3:.1f} GiB" for shard in shards),
+            )
+
+        migration_type = MigrationType.replicate if self.cdc_from_snapshot else MigrationType.migrate_replicate
+        shards_table_mappings = get_shards_table_mappings(source_catalog, shards, migration_type)
+
+        # Both endpoints are created before waiting, so they become active at the same time
+        source_endpoint = SourceEndpoint(
+            self.rds_instance,
+            database=database,
+            kms_key_arn=self.kms_key_arn,
+            slot_name=get_replication_slot_name(database) if self.cdc_from_snapshot else None,
+        ).get_or_create_endpoint()
+        target_endpoint = TargetEndpoint(
+            encrypted_rds_instance,
+            database=database,
+            kms_key_arn=self.kms_key_arn,
+        ).get_or_create_endpoint()
+        source_endpoint.wait_until_created()
+        target_endpoint.wait_until_created()
+
+        migration_tasks = []
+        for shard in shards:
+            task_name = f"{self.rds_instance.instance_id}-{database}-{MIGRATION_SEED}"
+            if len(shards) > 1:
+                task_name += f"-shard-{shard.index}"
+            task_name = normalize_aws_id(task_name)
+            shard_profile = (
+                profile
+                if len(shards) == 1
+                else WorkloadProfile.from_tables(shard.tables, writes_per_second=profile.writes_per_second)
+            )
+            shard_table_settings = get_shard_table_settings(table_settings, shards, shard)
+            # Content verification replaces DMS row-level validation and frees replication instance capacity
+            task_settings = tune_task_settings(
+                shard_profile,
+                instance_class=instance_class,
+                enable_validation=not self.content_verification,
+                # Changes between the slot LSN and the snapshot are already on the target and are applied again
+                idempotent_apply=self.cdc_from_snapshot,
+                lob_max_size_kb=lob_plan.lob_max_size_kb if lob_plan else None,
+                parallel_load_segments=count_parallel_load_segments(shard_table_settings),
+            )
+            self.logger.info(
+                'Task "%s" workload: %s tables, %.1f GiB total, largest %.1f GiB, %s with LOBs, %.0f writes/s',
+                task_name,
+                shard_profile.table_count,
+                shard_profile.total_bytes / 1024**3,
+                shard_profile.largest_table_bytes / 1024**3,
+                shard_profile.lob_table_count,
+                shard_profile.writes_per_second,
             )
+            self.logger.info('Task "%s" settings tuned from defaults: %s', task_name, diff_task_settings(task_settings))
             migration_task = MigrationTask.create_migration_task(
-                name=normalize_aws_id(f"{self.rds_instance.instance_id}-{database}-{MIGRATION_SEED}"),
+                name=task_name,
                 source_endpoint=source_endpoint,
                 target_endpoint=target_endpoint,
                 replication_instance=dms_replication_instance,
-                migration_type=MigrationType.migrate_replicate,
-                table_mappings=[
-                    TableMapping(schema="%", table="%", action="include"),
-                    TableMapping(schema="pg_%", table="%", action="exclude"),
-                    TableMapping(schema="information_schema", table="%", action="exclude"),
-                    TableMapping(schema="pglogical", table="%", action="exclude"),
-                    *exclude_partitioned_tables,
-                ],
+                migration_type=migration_type,
+                table_mappings=shards_table_mappings[shard.index],
                 tags=self.rds_instance.tags,
+                task_settings=task_settings,
+                wait_for_replication_instance=False,
+                cdc_start_position=self.cdc_start_positions.get(database),
+                table_settings=shard_table_settings,
             )
+            migration_tasks.append((migration_task, shard.size_bytes))
+        return migration_tasks
 
-            self.logger.info(
-                'Truncating tables in "%s" database for instance "%s" ...', database, encrypted_rds_instance.instance_id
-            )
-            encrypted_instance_db_manager.truncate_database()
-            self.logger.info(
-                'Tables truncated in "%s" database for instance "%s"', database, encrypted_rds_instance.instance_id
+    def create_replication_tasks(self, encrypted_rds_instance: RDSInstance) -> MigrationTaskManager:
+        """
+        Provisions endpoints and migration tasks of all databases at the same time, while target
+        databases are truncated in the background. Targets keep the restored data in CDC from snapshot mode.
+        """
+        dms_replication_instance = ReplicationInstance.from_arn(arn=self.dms_replication_instance_arn)
+        task_manager = MigrationTaskManager(
+            scheduler=CapacityScheduler(dms_replication_instance, max_concurrent_tasks=self.max_concurrent_tasks)
+        )
+        instance_class = dms_replication_instance.get_instance_class()
+        profiles = asyncio.run(self.get_workload_profiles_async())
+        lob_plans = asyncio.run(self.get_lob_plans_async()) if self.lob_profiling else {}
+        parallel_load_settings = asyncio.run(self.get_parallel_load_settings_async()) if self.parallel_load else {}
+
+        started_at = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.db_concurrency + 1, thread_name_prefix="provisioning") as executor:
+            truncation = (
+                None
+                if self.cdc_from_snapshot
+                else executor.submit(asyncio.run, self.truncate_target_databases_async(encrypted_rds_instance))
             )
-            task_manager.add_task(migration_task)
+            futures = {
+                database: executor.submit(
+                    self.provision_replication_tasks,
+                    database,
+                    encrypted_rds_instance,
+                    dms_replication_instance,
+                    instance_class,
+                    profiles[database],
+                    lob_plans.get(database),
+                    parallel_load_settings.get(database),
+                )
+                for database in self.databases
+            }
+            migration_tasks = {database: future.result() for database, future in futures.items()}
+            if truncation is not None:
+                truncation.result()
 
+        # Creating tasks modifies the replication instance, it has to be active before any task starts
+        dms_replication_instance.wait_until_active()
+        for database, database_tasks in migration_tasks.items():
+            for migration_task, size_bytes in database_tasks:
+                task_manager.add_task(migration_task, size_bytes=size_bytes, group=database)
+        self.logger.info(
+            "Provisioned %s migration tasks in %.0fs", len(task_manager.tasks), time.monotonic() - started_at
+        )
         return task_manager
 
-    def migrate_databases_sequences(self, encrypted_rds_instance: RDSInstance):
-        for database in self.databases:
-            self.logger.info(
-                'Start migrating "%s" database sequences from "%s" to "%s" instance...',
-                database,
-                self.rds_instance.instance_id,
-                encrypted_rds_instance.instance_id,
-            )
-            source_db_manager = DBManager.from_rds(rds_instance=self.rds_instance, database=database)
-            target_db_manager = DBManager.from_rds(rds_instance=encrypted_rds_instance, database=database)
-            sequences = source_db_manager.get_sequences()
-            target_db_manager.set_sequences(sequences)
-            self.logger.info(
-                'Sequences migrated for "%s" database from "%s" to "%s" instance',
-                database,
-                self.rds_instance.instance_id,
-                encrypted_rds_instance.instance_id,
-            )
+    async def truncate_target_database_async(self, encrypted_rds_instance: RDSInstance, database: str) -> int:
+        self.logger.info(
+            'Truncating tables in "%s" database for instance "%s" ...', database, encrypted_rds_instance.instance_id
+        )
+        db_manager = AsyncDBManager.from_rds(rds_instance=encrypted_rds_instance, database=database)
+        return await db_manager.truncate_database()
 
-    def check_data_consistency(self, encrypted_rds_instance: RDSInstance):
-        for database in self.databases:
-            source_db_manager = DBManager.from_rds(rds_instance=self.rds_instance, database=database)
-            target_db_manager = DBManager.from_rds(rds_instance=encrypted_rds_instance, database=database)
-            self.logger.info(
-                'Checking data consistency for "%s" database between "%s" and "%s" instances...',
-                database,
-                self.rds_instance.instance_id,
-                encrypted_rds_instance.instance_id,
-            )
-            tables = source_db_manager.get_all_tables()
+    async def truncate_target_databases_async(self, encrypted_rds_instance: RDSInstance):
+        await gather_limited(
+            self.databases,
+            lambda database: self.truncate_target_database_async(encrypted_rds_instance, database),
+            self.db_concurrency,
+        )
 
-            iterator = zip(
-                tables, source_db_manager.iter_count(tables), target_db_manager.iter_count(tables), strict=True
-            )
+    async def migrate_database_sequences_async(self, encrypted_rds_instance: RDSInstance, database: str) -> int:
+        self.logger.info(
+            'Start migrating "%s" database sequences from "%s" to "%s" instance...',
+            database,
+            self.rds_instance.instance_id,
+            encrypted_rds_instance.instance_id,
+        )
+        source_db_manager = AsyncDBManager.from_rds(rds_instance=self.rds_instance, database=database)
+        target_db_manager = AsyncDBManager.from_rds(rds_instance=encrypted_rds_instance, database=database)
+        sequences = await source_db_manager.get_sequences()
+        migrated = await target_db_manager.set_sequences(sequences, margin=self.sequence_margin)
+        self.logger.info(
+            '%s sequences migrated for "%s" database from "%s" to "%s" instance',
+            migrated,
+            database,
+            self.rds_instance.instance_id,
+            encrypted_rds_instance.instance_id,
+        )
+        return migrated
 
-            diff_count = {}
+    async def migrate_databases_sequences_async(self, encrypted_rds_instance: RDSInstance):
+        started_at = time.monotonic()
+        migrated = await gather_limited(
+            self.databases,
+            lambda database: self.migrate_database_sequences_async(encrypted_rds_instance, database),
+            self.db_concurrency,
+        )
+        self.logger.info(
+            "%s sequences of %s databases migrated in %.1fs",
+            sum(migrated),
+            len(self.databases),
+            time.monotonic() - started_at,
+        )
 
-            for table, source_count, target_count in iterator:
-                if source_count != target_count:
-                    diff_count[table] = (source_count, target_count)
-                    self.logger.error(
-                        'Data inconsistency for table "%s" between "%s" and "%s" instances: '
-                        "source count=%s, target count=%s",
-                        table,
-                        self.rds_instance.instance_id,
-                        encrypted_rds_instance.instance_id,
-                        source_count,
-                        target_count,
-                    )
+    def migrate_databases_sequences(self, encrypted_rds_instance: RDSInstance):
+        asyncio.run(self.migrate_databases_sequences_async(encrypted_rds_instance))
 
-            if not diff_count:
+    def check_data_consistency(self, encrypted_rds_instance: RDSInstance) -> dict[str, list[TableConsistency]]:
+        self.logger.info(
+            'Checking data consistency for %s databases between "%s" and "%s" instances...',
+            len(self.databases),
+            self.rds_instance.instance_id,
+            encrypted_rds_instance.instance_id,
+        )
+        report = RowCountVerifier(
+            source_instance=self.rds_instance,
+            target_instance=encrypted_rds_instance,
+            databases=self.databases,
+            max_workers=self.consistency_check_workers,
+            tolerance=self.consistency_tolerance,
+            exact=self.exact_consistency_check,
+        ).run()
+
+        for database, results in report.items():
+            statuses = Counter(result.status for result in results)
+            if not statuses[ConsistencyStatus.MISMATCH]:
                 self.logger.info(
-                    'Data consistency check for "%s" database between "%s" and "%s" instances passed',
+                    'Data consistency check for "%s" database between "%s" and "%s" instances passed: '
+                    "%s estimated-match, %s exact-match",
                     database,
                     self.rds_instance.instance_id,
                     encrypted_rds_instance.instance_id,
+                    statuses[ConsistencyStatus.ESTIMATED_MATCH],
+                    statuses[ConsistencyStatus.EXACT_MATCH],
                 )
             else:
                 self.logger.error(
-                    'Data consistency check for "%s" database between "%s" and "%s" instances failed',
+                    'Data consistency check for "%s" database between "%s" and "%s" instances failed: '
+                    "%s estimated-match, %s exact-match, %s mismatch",
                     database,
                     self.rds_instance.instance_id,
                     encrypted_rds_instance.instance_id,
+                    statuses[ConsistencyStatus.ESTIMATED_MATCH],
+                    statuses[ConsistencyStatus.EXACT_MATCH],
+                    statuses[ConsistencyStatus.MISMATCH],
+                )
+        return report
+
+    def verify_data_content(self, encrypted_rds_instance: RDSInstance) -> dict[str, list[ChunkMismatch]]:
+        self.logger.info(
+            'Verifying data content for %s databases between "%s" and "%s" instances...',
+            len(self.databases),
+            self.rds_instance.instance_id,
+            encrypted_rds_instance.instance_id,
+        )
+        report = ContentHashVerifier(
+            source_instance=self.rds_instance,
+            target_instance=encrypted_rds_instance,
+            databases=self.databases,
+            max_workers=self.consistency_check_workers,
+            progress_path=self.content_verification_progress_path,
+        ).run()
+
+        for database, mismatches in report.items():
+            if not mismatches:
+                self.logger.info('Data content verification for "%s" database passed', database)
+            else:
+                self.logger.error(
+                    'Data content verification for "%s" database failed: %s rows differ in %s tables',
+                    database,
+                    sum(len(mismatch.keys) for mismatch in mismatches),
+                    len({mismatch.table for mismatch in mismatches}),
+                )
+        return report
+
+    def run_replication_tasks(self, task_manager: MigrationTaskManager) -> bool:
+        telemetry = MigrationTelemetry(
+            poller=task_manager.poller, output_path=self.telemetry_path, interval=self.telemetry_interval
+        )
+        for task in task_manager.tasks:
+            database = task_manager.task_groups[task.arn]
+            telemetry.track(task, DBManager.from_rds(rds_instance=self.rds_instance, database=database).catalog)
+        if self.telemetry_path:
+            self.logger.info('Writing replication telemetry to "%s"', self.telemetry_path)
+        telemetry.start()
+        try:
+            return task_manager.run_all()
+        finally:
+            telemetry.stop()
+
+    def wait_for_replication_lag(self, lag_monitor: LagMonitor) -> float:
+        """
+        Cutover gate: waits until replication lag of every database stays below ``max_replication_lag``.
+        """
+        self.logger.info(
+            "Waiting for replication lag to stay below %.1fs for %.0fs ...",
+            self.max_replication_lag,
+            self.replication_lag_stable_seconds,
+        )
+        lag_monitor.start()
+        try:
+            return lag_monitor.wait_until_caught_up(
+                max_lag=self.max_replication_lag, stable_for=self.replication_lag_stable_seconds
+            )
+        finally:
+            lag_monitor.stop()
+
+    @contextmanager
+    def _cutover_phase(self, phase: str, timings: dict[str, float]) -> Generator[None, None, None]:
+        self.logger.info('Cutover phase "%s" started', phase)
+        started_at = time.monotonic()
+        try:
+            yield
+        finally:
+            timings[phase] = time.monotonic() - started_at
+            self.logger.info('Cutover phase "%s" took %.1fs', phase, timings[phase])
+
+    async def set_source_database_read_only_async(self, database: str, read_only: bool) -> int:
+        db_manager = AsyncDBManager.from_rds(rds_instance=self.rds_instance, database=database)
+        await db_manager.set_read_only(read_only)
+        if not read_only:
+            return 0
+        # Default read-only mode applies to new sessions only, so existing ones are disconnected
+        terminated = await db_manager.terminate_client_backends()
+        self.logger.info('"%s" database is read-only, %s client sessions terminated', database, terminated)
+        return terminated
+
+    async def set_source_databases_read_only_async(self, read_only: bool):
+        await gather_limited(
+            self.databases,
+            lambda database: self.set_source_database_read_only_async(database, read_only),
+            self.db_concurrency,
+        )
+
+    def switch_endpoints(self, encrypted_rds_instance: RDSInstance):
+        """
+        Gives the encrypted instance the identifier, and so the endpoint, of the source instance.
+        """
+        source_instance_id = self.rds_instance.instance_id
+        retired_instance_id = normalize_aws_id(f"{source_instance_id}-{MIGRATION_SEED}-unencrypted")
+        self.rds_instance.rename(retired_instance_id)
+        encrypted_rds_instance.rename(source_instance_id)
+        self.logger.info(
+            'Encrypted instance now serves "%s" endpoint, unencrypted instance was renamed to "%s"',
+            encrypted_rds_instance.endpoint,
+            retired_instance_id,
+        )
+
+    def run_cutover(
+        self, encrypted_rds_instance: RDSInstance, lag_monitor: LagMonitor, task_manager: MigrationTaskManager
+    ) -> dict[str, list[TableConsistency]]:
+        """
+        Switches applications to the encrypted instance with minimal write downtime.
+
+        Waits until replication caught up, blocks writes on the source, waits until the last changes
+        are applied, syncs sequences, checks row counts, stops the DMS tasks and switches (or prints how
+        to switch) the endpoint. Source writes are restored if any phase before the switch fails.
+
+        The tasks are stopped before the switch: after the rename the source endpoint of the tasks resolves
+        to the encrypted instance, and a reconnecting task would replicate its changes back into it.
+        """
+        timings: dict[str, float] = {}
+        lag_monitor.start()
+        try:
+            with self._cutover_phase("catch-up", timings):
+                lag_monitor.wait_until_caught_up(
+                    max_lag=self.max_replication_lag, stable_for=self.replication_lag_stable_seconds
                 )
 
+            writes_blocked_at = time.monotonic()
+            try:
+                with self._cutover_phase("block-writes", timings):
+                    asyncio.run(self.set_source_databases_read_only_async(read_only=True))
+                with self._cutover_phase("drain", timings):
+                    lag_monitor.wait_until_drained()
+                with self._cutover_phase("sequences", timings):
+                    self.migrate_databases_sequences(encrypted_rds_instance)
+                with self._cutover_phase("verification", timings):
+                    report = self.check_data_consistency(encrypted_rds_instance)
+                mismatches = sum(
+                    result.status == ConsistencyStatus.MISMATCH for results in report.values() for result in results
+                )
+                if mismatches:
+                    raise CutoverFailedException(f"{mismatches} tables differ between source and target")
+                with self._cutover_phase("stop-tasks", timings):
+                    task_manager.stop_all()
+            except Exception:
+                self.logger.exception("Cutover failed, restoring writes on the source instance")
+                asyncio.run(self.set_source_databases_read_only_async(read_only=False))
+                raise
+        finally:
+            lag_monitor.stop()
+
+        if self.cutover_switch_endpoints:
+            with self._cutover_phase("switch", timings):
+                self.switch_endpoints(encrypted_rds_instance)
+        else:
+            self.logger.info(
+                'Source instance is read-only and DMS tasks are stopped, point applications to "%s:%s" now. '
+                'To keep the endpoint, rename "%s" instance and then rename "%s" instance to "%s". '
+                "Keep the DMS tasks stopped before any rename, they would copy the encrypted instance into itself.",
+                encrypted_rds_instance.endpoint,
+                encrypted_rds_instance.port,
+                self.rds_instance.instance_id,
+                encrypted_rds_instance.instance_id,
+                self.rds_instance.instance_id,
+            )
+        self.logger.info(
+            "Cutover finished, writes were unavailable for %.1fs: %s",
+            time.monotonic() - writes_blocked_at,
+            ", ".join(f"{phase} {elapsed:.1f}s" for phase, elapsed in timings.items()),
+        )
+        return report
+
+    def recover_tables(
+        self,
+        task_manager: MigrationTaskManager,
+        encrypted_rds_instance: RDSInstance,
+        report: dict[str, list[TableConsistency]] | None = None,
+    ) -> dict[str, list[str]]:
+        """
+        Reloads failed or suspended tables, and tables the consistency check found mismatched, in the running tasks.
+        The tasks load without preparing target tables and ignore conflicts, so the tables are emptied on the
+        target first, otherwise stale rows would survive the reload and rows without a primary key doubled.
+
+        :return: Tables that failed again after the reload, per task id
+        """
+
+        def truncate_target_tables(task: MigrationTask, tables: list[str]) -> None:
+            database = task_manager.task_groups[task.arn]
+            self.logger.info('Truncating %s tables of "%s" database before reloading them', len(tables), database)
+            DBManager.from_rds(rds_instance=encrypted_rds_instance, database=database).truncate_tables(tables)
+
+        mismatched = {
+            database: [result.table for result in results if result.status == ConsistencyStatus.MISMATCH]
+            for database, results in (report or {}).items()
+        }
+        return task_manager.recover_tables(
+            {database: self.get_migrated_tables(database, tables) for database, tables in mismatched.items() if tables},
+            before_reload=truncate_target_tables,
+        )
+
+    def get_migrated_tables(self, database: str, tables: list[str]) -> list[str]:
+        """
+        Replaces partitioned tables with their leaf partitions, the tables DMS migrates and can reload.
+        A partitioned table whose mismatched leaf partitions are already listed adds no other partitions.
+        """
+        catalog = DBManager.from_rds(rds_instance=self.rds_instance, database=database).catalog
+        listed = set(tables)
+        migrated = []
+        for table in tables:
+            catalog_table = catalog.tables.get(table)
+            if catalog_table is None or not catalog_table.is_partitioned:
+                migrated.append(table)
+                continue
+            leaves = [leaf.qualified_name for leaf in catalog.leaf_partitions(table)]
+            if not listed.intersection(leaves):
+                migrated.extend(leaves)
+        return list(dict.fromkeys(migrated))
+
     def rollback_parameter_group(self, encrypted_rds_instance: RDSInstance):
         # TODO: DEPRECATED
         original_parameter_group_name = get_original_parameter_group(self.rds_instance.parameter_group.name)
@@ -268,30 +709,118 @@ class EncryptionPipeline:
         self.logger.info('Rollback to "%s" parameter group finished', original_parameter_group_name)
 
     def run_pipeline(self):
+        try:
+            self._run_pipeline()
+        finally:
+            PostgresDBManager.pool.log_stats()
+            DescribeCache.log_stats()
+            PostgresDBManager.pool.close_all()
+
+    def apply_parameter_group(self, rds_instance: RDSInstance, parameter_group: ParameterGroup):
+        if rds_instance.parameter_group.name == parameter_group.name:
+            return
+        rds_instance.wait_until_available().set_parameter_group(parameter_group).wait_until_available()
+        input(f'Please reboot "{rds_instance.instance_id}" database and hit <Enter>')
+        rds_instance.wait_until_available()
+
+    async def create_replication_slot_async(self, database: str) -> str:
+        db_manager = AsyncDBManager.from_rds(rds_instance=self.rds_instance, database=database)
+        return await db_manager.create_replication_slot(get_replication_slot_name(database))
+
+    async def create_replication_slots_async(self):
+        positions = await gather_limited(self.databases, self.create_replication_slot_async, self.db_concurrency)
+        self.cdc_start_positions = dict(zip(self.databases, positions, strict=True))
+
+    async def drop_replication_slots_async(self, rds_instance: RDSInstance):
+        await gather_limited(
+            self.databases,
+            lambda database: AsyncDBManager.from_rds(
+                rds_instance=rds_instance, database=database
+            ).drop_replication_slot(get_replication_slot_name(database)),
+            self.db_concurrency,
+        )
+
+    def release_replication_slots(self, task_manager: MigrationTaskManager | None) -> None:
+        """
+        Stops the CDC-only tasks and drops the replication slots they read from on the source, an unused
+        logical slot retains WAL without limit. Runs on failures too, so errors are logged.
+        """
+        try:
+            if task_manager is not None:
+                task_manager.stop_all()
+            asyncio.run(self.drop_replication_slots_async(self.rds_instance))
+            self.logger.info('Replication slots dropped on "%s"', self.rds_instance.instance_id)
+        except Exception:
+            self.logger.exception(
+                'Cannot drop replication slots on "%s", drop them once the DMS tasks are stopped',
+                self.rds_instance.instance_id,
+            )
+
+    def _run_pipeline(self):
         self.check_databases_connections()
-        encrypted_rds_instance = self.create_encrypted_instance()
-        migration_parameter_group = self.create_parameter_group_for_dms()
+        if self.max_replication_lag is not None:
+            LagMonitor.create_heartbeat_tables(self.rds_instance, self.databases, shards=self.max_tasks_per_database)
+        lag_monitor = None
+        task_manager = None
+        succeeded = False
+        try:
+            migration_parameter_group = self.create_parameter_group_for_dms()
 
-        # TODO: Need to set previous parameter group after migration
-        if self.rds_instance.parameter_group.name != migration_parameter_group.name:
-            self.rds_instance.wait_until_available().set_parameter_group(
-                migration_parameter_group
-            ).wait_until_available()
-            input(f'Please reboot "{self.rds_instance.instance_id}" database and hit <Enter>')
-            self.rds_instance.wait_until_available()
-        if encrypted_rds_instance.parameter_group.name != migration_parameter_group.name:
-            encrypted_rds_instance.wait_until_available().set_parameter_group(
-                migration_parameter_group
-            ).wait_until_available()
-            input(f'Please reboot "{encrypted_rds_instance.instance_id}" database and hit <Enter>')
-            encrypted_rds_instance.wait_until_available()
-        self.create_pglogical_extension_in_source_db()
+            # TODO: Need to set previous parameter group after migration
+            if self.cdc_from_snapshot:
+                # Logical replication has to be enabled on the source to create the slots the snapshot starts from
+                self.apply_parameter_group(self.rds_instance, migration_parameter_group)
+                asyncio.run(self.create_replication_slots_async())
+            encrypted_rds_instance = self.create_encrypted_instance()
+            if self.max_replication_lag is not None:
+                lag_monitor = LagMonitor(
+                    self.rds_instance, encrypted_rds_instance, self.databases, shards=self.max_tasks_per_database
+                )
+            self.apply_parameter_group(self.rds_instance, migration_parameter_group)
+            self.apply_parameter_group(encrypted_rds_instance, migration_parameter_group)
+            if self.cdc_from_snapshot:
+                # Slots are restored from the snapshot too and would retain WAL on the encrypted instance
+                asyncio.run(self.drop_replication_slots_async(encrypted_rds_instance))
+            else:
+                self.create_pglogical_extension_in_source_db()
 
-        task_manager = self.create_replication_tasks(encrypted_rds_instance)
+            task_manager = self.create_replication_tasks(encrypted_rds_instance)
 
-        if task_manager.run_all():
-            self.logger.info("All tasks finished successfully.")
-            self.migrate_databases_sequences(encrypted_rds_instance)
-            self.check_data_consistency(encrypted_rds_instance)
-        else:
-            self.logger.warning("One or more tasks finished with errors.")
+            if self.run_replication_tasks(task_manager):
+                self.logger.info("All tasks finished successfully.")
+                if self.table_recovery:
+                    self.recover_tables(task_manager, encrypted_rds_instance)
+                if self.cutover:
+                    report = self.run_cutover(encrypted_rds_instance, lag_monitor, task_manager)
+                else:
+                    if lag_monitor is not None:
+                        self.wait_for_replication_lag(lag_monitor)
+                    self.migrate_databases_sequences(encrypted_rds_instance)
+                    report = self.check_data_consistency(encrypted_rds_instance)
+                if self.table_recovery and any(
+                    result.status == ConsistencyStatus.MISMATCH for results in report.values() for result in results
+                ):
+                    self.recover_tables(task_manager, encrypted_rds_instance, report)
+                    self.check_data_consistency(encrypted_rds_instance)
+                if self.content_verification:
+                    self.verify_data_content(encrypted_rds_instance)
+                succeeded = True
+            else:
+                self.logger.warning("One or more tasks finished with errors.")
+        finally:
+            # Tasks keep replicating from the slots until cutover, a failed migration does not resume from them
+            if self.cdc_from_snapshot:
+                if self.cutover or not succeeded:
+                    self.release_replication_slots(task_manager)
+                else:
+                    self.logger.info(
+                        'DMS tasks replicate from replication slots on "%s", drop them once the tasks are stopped',
+                        self.rds_instance.instance_id,
+                    )
+            # Heartbeat tables are dropped on failures too, the encrypted instance has them once it is restored
+            if lag_monitor is not None:
+                lag_monitor.cleanup()
+            elif self.max_replication_lag is not None:
+                LagMonitor.drop_heartbeat_tables(
+                    [self.rds_instance], self.databases, shards=self.max_tasks_per_database
+                )
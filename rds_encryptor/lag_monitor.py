@@ -0,0 +1,203 @@
+import time
+from threading import Event, Lock, Thread
+
+import psycopg2
+
+from rds_encryptor.catalog import get_heartbeat_table
+from rds_encryptor.db_manager import DBManager
+from rds_encryptor.rds.instance import RDSInstance
+from rds_encryptor.utils import get_logger
+from rds_encryptor.waiter import Waiter
+
+
+class LagMonitor:
+    """
+    Measures end-to-end replication lag of every database with heartbeat tables.
+
+    A heartbeat with an increasing sequence number is inserted into the source database every
+    ``interval`` seconds and the latest sequence number replicated to the target is read back. Write
+    times are taken from the local monotonic clock, so the lag is not affected by clock skew between
+    the instances: it is the time since the oldest heartbeat the target has not seen yet, or 0 when
+    the target has every heartbeat.
+
+    Databases migrated by up to ``shards`` tasks get one heartbeat table per shard index, every task
+    replicates its own. A heartbeat counts as applied once it reached the target through every task.
+    """
+
+    logger = get_logger("LagMonitor")
+
+    def __init__(
+        self,
+        source_instance: RDSInstance,
+        target_instance: RDSInstance,
+        databases: list[str],
+        interval: float = 5,
+        shards: int = 1,
+    ):
+        self.source_instance = source_instance
+        self.target_instance = target_instance
+        self.databases = databases
+        self.interval = interval
+        self.shards = shards
+        self.tables = self.get_heartbeat_tables(shards)
+        self._seq = 0
+        # database -> {sequence number: monotonic write time} of heartbeats not seen on the target yet
+        self._pending: dict[str, dict[int, float]] = {database: {} for database in databases}
+        self._lags: dict[str, float | None] = dict.fromkeys(databases)
+        # database -> monotonic write time of the latest heartbeat seen on the target
+        self._last_applied: dict[str, float | None] = dict.fromkeys(databases)
+        self._lock = Lock()
+        self._stopped = Event()
+        self._thread: Thread | None = None
+
+    @staticmethod
+    def get_heartbeat_tables(shards: int) -> list[str]:
+        return [get_heartbeat_table(shard_index) for shard_index in range(shards)]
+
+    @classmethod
+    def create_heartbeat_tables(cls, source_instance: RDSInstance, databases: list[str], shards: int = 1) -> None:
+        """
+        Creates heartbeat tables in the source databases, must run before the snapshot is taken, so
+        the tables exist on the target when changes are replicated from a replication slot.
+        """
+        tables = cls.get_heartbeat_tables(shards)
+        for database in databases:
+            DBManager.from_rds(rds_instance=source_instance, database=database).create_heartbeat_tables(tables)
+        cls.logger.info("%s heartbeat tables created in %s source databases", len(tables), len(databases))
+
+    @classmethod
+    def drop_heartbeat_tables(cls, instances: list[RDSInstance], databases: list[str], shards: int = 1) -> None:
+        """
+        Runs on failures too, so errors are logged instead of hiding the error the migration stopped with.
+        """
+        tables = cls.get_heartbeat_tables(shards)
+        for rds_instance in instances:
+            for database in databases:
+                try:
+                    DBManager.from_rds(rds_instance=rds_instance, database=database).drop_heartbeat_tables(tables)
+                except psycopg2.Error as e:
+                    cls.logger.warning(
+                        'Cannot drop heartbeat table of "%s" database on "%s": %s',
+                        database,
+                        rds_instance.instance_id,
+                        e,
+                    )
+        cls.logger.info("Heartbeat tables dropped in %s databases", len(databases))
+
+    def cleanup(self) -> None:
+        self.drop_heartbeat_tables([self.source_instance, self.target_instance], self.databases, self.shards)
+
+    def _measure(self, database: str, seq: int) -> float | None:
+        DBManager.from_rds(rds_instance=self.source_instance, database=database).write_heartbeat(seq, self.tables)
+        written_at = time.monotonic()
+        applied = DBManager.from_rds(rds_instance=self.target_instance, database=database).read_heartbeat(self.tables)
+        now = time.monotonic()
+
+        with self._lock:
+            pending = self._pending[database]
+            pending[seq] = written_at
+            if applied is None:
+                return None
+            for applied_seq in sorted(pending_seq for pending_seq in pending if pending_seq <= applied):
+                self._last_applied[database] = pending.pop(applied_seq)
+            return now - min(pending.values()) if pending else 0.0
+
+    def sample(self) -> dict[str, float | None]:
+        self._seq += 1
+        for database in self.databases:
+            try:
+                lag = self._measure(database, self._seq)
+            except psycopg2.DatabaseError as e:
+                self.logger.warning('Cannot measure replication lag of "%s" database: %s', database, e)
+                lag = None
+            with self._lock:
+                self._lags[database] = lag
+        return self.get_lags()
+
+    def get_lags(self) -> dict[str, float | None]:
+        """
+        :return: Replication lag per database in seconds, None if not known yet
+        """
+        with self._lock:
+            return dict(self._lags)
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self.sample()
+            self._stopped.wait(self.interval)
+
+    def start(self) -> "LagMonitor":
+        self._stopped.clear()
+        self._thread = Thread(target=self._run, name="lag-monitor", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def wait_until_caught_up(self, max_lag: float, stable_for: float = 60, timeout: int = 4 * 60 * 60) -> float:
+        """
+        Cutover gate: waits until the lag of every database stays below ``max_lag`` for ``stable_for`` seconds.
+
+        :param max_lag: Highest acceptable replication lag in seconds
+        :param stable_for: How long the lag has to stay below ``max_lag`` in seconds
+        :param timeout: Timeout in seconds
+        :return: Time spent waiting in seconds
+        """
+        caught_up_since = None
+
+        def poll() -> tuple[bool, str]:
+            nonlocal caught_up_since
+            lags = self.get_lags()
+            lagging = {database: lag for database, lag in lags.items() if lag is None or lag > max_lag}
+            if lagging:
+                caught_up_since = None
+            elif caught_up_since is None:
+                caught_up_since = time.monotonic()
+            known = [lag for lag in lags.values() if lag is not None]
+            state = f"max lag {max(known):.1f}s" if known else "lag unknown"
+            if lagging:
+                state += f", {len(lagging)} databases lagging"
+            return caught_up_since is not None and time.monotonic() - caught_up_since >= stable_for, state
+
+        elapsed = Waiter.wait(
+            kind="replication-lag",
+            name=self.source_instance.instance_id,
+            poll=poll,
+            timeout=timeout,
+            interval=max(self.interval, stable_for / 4),
+            min_interval=self.interval,
+        )
+        self.logger.info("Replication lag per database: %s", self.get_lags())
+        return elapsed
+
+    def wait_until_drained(self, timeout: int = 30 * 60) -> float:
+        """
+        Waits until every database replicated a heartbeat written after this call. Once writes to the
+        source are blocked, this means all earlier changes were applied to the target.
+
+        :param timeout: Timeout in seconds
+        :return: Time spent waiting in seconds
+        """
+        barrier = time.monotonic()
+
+        def poll() -> tuple[bool, str]:
+            with self._lock:
+                draining = [
+                    database
+                    for database, applied_at in self._last_applied.items()
+                    if applied_at is None or applied_at < barrier
+                ]
+            return not draining, f"{len(draining)} databases draining"
+
+        return Waiter.wait(
+            kind="replication-drain",
+            name=self.source_instance.instance_id,
+            poll=poll,
+            timeout=timeout,
+            interval=self.interval,
+            min_interval=self.interval / 5,
+        )
@@ -1,18 +1,18 @@
 import time
-from datetime import UTC, datetime, timedelta
 from typing import Optional
 
-import boto3
 from botocore.exceptions import ClientError
 
+from rds_encryptor.aws import DescribeCache, LazyClient
 from rds_encryptor.rds.parameter_group import ParameterGroup
 from rds_encryptor.rds.snapshot import RDSSnapshot
 from rds_encryptor.utils import MIGRATION_SEED, get_logger
+from rds_encryptor.waiter import Waiter
 
 
 class RDSInstance:
     logger = get_logger("RDSInstance")
-    aws_client = boto3.client("rds")
+    aws_client = LazyClient("rds")
 
     def __init__(
         self,
@@ -46,9 +46,12 @@ class RDSInstance:
             raise ValueError("You must call .wait_until_available() first to get the port")
         return self._port
 
-    def _describe(self) -> dict:
-        instances = self.aws_client.describe_db_instances(
-            DBInstanceIdentifier=self.instance_id,
+    def _describe(self, max_age: float | None = None) -> dict:
+        """
+        :param max_age: Oldest cached description accepted in seconds, 0 reads the current state
+        """
+        instances = DescribeCache.describe(
+            "rds", "describe_db_instances", max_age=max_age, DBInstanceIdentifier=self.instance_id
         )["DBInstances"]
         if len(instances) > 1:
             raise ValueError(f"Multiple instances found: {self.instance_id}")
@@ -64,9 +67,9 @@ class RDSInstance:
         assert root_password, "Root password is required"
 
         try:
-            instances = cls.aws_client.describe_db_instances(
-                DBInstanceIdentifier=instance_id,
-            )["DBInstances"]
+            instances = DescribeCache.describe("rds", "describe_db_instances", DBInstanceIdentifier=instance_id)[
+                "DBInstances"
+            ]
         except ClientError as e:
             if e.response["Error"]["Code"] == "DBInstanceNotFound":
                 return None
@@ -88,7 +91,7 @@ class RDSInstance:
         )
 
     def get_status(self) -> str:
-        instance = self._describe()
+        instance = self._describe(max_age=0)
         return instance["DBInstanceStatus"]
 
     def take_snapshot(self) -> RDSSnapshot:
@@ -141,18 +144,56 @@ class RDSInstance:
         self.logger.info('"%s" instance modified', self.instance_id)
         return self
 
+    def rename(self, new_instance_id: str, timeout: int = 30 * 60, pooling_frequency: int = 10) -> "RDSInstance":
+        """
+        Renames the instance and waits until it is available under the new identifier, the endpoint
+        follows the identifier.
+        """
+        self.logger.info('Renaming "%s" instance to "%s" ...', self.instance_id, new_instance_id)
+        self.aws_client.modify_db_instance(
+            DBInstanceIdentifier=self.instance_id,
+            NewDBInstanceIdentifier=new_instance_id,
+            ApplyImmediately=True,
+        )
+        old_instance_id = self.instance_id
+        self.instance_id = new_instance_id
+
+        def poll() -> tuple[bool, str]:
+            # The old identifier is still reported until the rename is applied
+            try:
+                self._describe(max_age=0)
+            except ClientError as e:
+                if e.response["Error"]["Code"] == "DBInstanceNotFound":
+                    return False, f'renaming from "{old_instance_id}"'
+                raise
+            return True, "renamed"
+
+        Waiter.wait(
+            kind="rds-instance-renamed",
+            name=new_instance_id,
+            poll=poll,
+            timeout=timeout,
+            interval=pooling_frequency,
+        )
+        return self.wait_until_available()
+
     def wait_until_available(self, timeout: int = 60 * 60, pooling_frequency: int = 30) -> "RDSInstance":
-        timeout_dt = datetime.now(tz=UTC) + timedelta(seconds=timeout)
         self.logger.info('Waiting for instance "%s" to become available ...', self.instance_id)
 
-        while datetime.now(tz=UTC) < timeout_dt:
-            instance = self._describe()
+        def poll() -> tuple[bool, str]:
+            instance = self._describe(max_age=0)
             status = instance["DBInstanceStatus"]
             if status == "available":
-                self.logger.info('Instance "%s" is available', self.instance_id)
                 self._endpoint = instance["Endpoint"]["Address"]
                 self._port = instance["Endpoint"]["Port"]
-                return self
-            time.sleep(pooling_frequency)
-
-        raise TimeoutError(f"Instance {self.instance_id} is not available after {timeout} seconds")
+            return status == "available", status
+
+        Waiter.wait(
+            kind="rds-instance-available",
+            name=self.instance_id,
+            poll=poll,
+            timeout=timeout,
+            interval=pooling_frequency,
+        )
+        self.logger.info('Instance "%s" is available', self.instance_id)
+        return self
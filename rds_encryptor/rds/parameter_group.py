@@ -1,10 +1,15 @@
+from collections.abc import Iterator
+from contextlib import contextmanager
 from typing import Optional
 
-import boto3
 from botocore.exceptions import ClientError
 
+from rds_encryptor.aws import DescribeCache, LazyClient
 from rds_encryptor.utils import MIGRATION_SEED, get_logger
 
+# modify_db_parameter_group accepts up to 20 parameters per call
+MAX_PARAMETERS_PER_MODIFY = 20
+
 
 def build_shared_preload_libraries_param(*libraries: str) -> str:
     return ",".join(map(str.strip, libraries))
@@ -22,21 +27,28 @@ def get_original_parameter_group(migration_parameter_group_name) -> str:
 
 
 class ParameterGroup:
-    aws_client = boto3.client("rds")
+    aws_client = LazyClient("rds")
     logger = get_logger("ParameterGroup")
 
     def __init__(self, name: str):
         self.name = name
-        self.properties = self._fetch_properties()
+        self._properties: dict[str, dict] | None = None
+
+    @property
+    def properties(self) -> dict[str, dict]:
+        """Parameters with a value, read on first use."""
+        if self._properties is None:
+            self._properties = self._fetch_properties()
+        return self._properties
 
     @classmethod
     def from_name(cls, name: str) -> Optional["ParameterGroup"]:
         assert name, "Parameter group name is required"
 
         try:
-            response = cls.aws_client.describe_db_parameter_groups(
-                DBParameterGroupName=name,
-            )["DBParameterGroups"]
+            response = DescribeCache.describe("rds", "describe_db_parameter_groups", DBParameterGroupName=name)[
+                "DBParameterGroups"
+            ]
         except ClientError as e:
             if e.response["Error"]["Code"] == "DBParameterGroupNotFound":
                 return None
@@ -57,15 +69,16 @@ class ParameterGroup:
         self.logger.info('Parameter group "%s" copied', new_parameter_group_name)
         return ParameterGroup(name=response["DBParameterGroup"]["DBParameterGroupName"])
 
-    def _fetch_properties(self):
-        response = self.aws_client.describe_db_parameters(
-            DBParameterGroupName=self.name,
-        )
+    def _fetch_properties(self, source: str | None = None) -> dict[str, dict]:
+        """
+        :param source: Only parameters of this source, e.g. "user" for the ones changed from the engine defaults
+        """
+        filters = {"Source": source} if source else {}
+        response = DescribeCache.describe("rds", "describe_db_parameters", DBParameterGroupName=self.name, **filters)
         parameters = response.get("Parameters", [])
         while response.get("Marker"):
-            response = self.aws_client.describe_db_parameters(
-                DBParameterGroupName=self.name,
-                Marker=response["Marker"],
+            response = DescribeCache.describe(
+                "rds", "describe_db_parameters", DBParameterGroupName=self.name, Marker=response["Marker"], **filters
             )
             parameters.extend(response.get("Parameters", []))
         return {
@@ -92,17 +105,49 @@ class ParameterGroup:
         return int(self.properties.get("rds.logical_replication", {"value": 0})["value"])
 
     def set_parameter(self, name: str, value: any) -> None:
-        parameter = {"ParameterName": name, "ParameterValue": str(value)}
-        old_parameter = self.properties.get(name)
-        if old_parameter is not None and old_parameter["apply_type"] != "static":
-            parameter["ApplyMethod"] = "immediate"
-        else:
-            parameter["ApplyMethod"] = "pending-reboot"
-        self.aws_client.modify_db_parameter_group(
-            DBParameterGroupName=self.name,
-            Parameters=[parameter],
-        )
-        self.properties = self._fetch_properties()
+        self.set_parameters({name: value})
+
+    def set_parameters(self, parameters: dict[str, any]) -> None:
+        """
+        Modifies parameters with as few calls as the API allows, then refreshes only the modified ones.
+        """
+        if not parameters:
+            return
+        changes = []
+        for name, value in parameters.items():
+            parameter = {"ParameterName": name, "ParameterValue": str(value)}
+            old_parameter = self.properties.get(name)
+            if old_parameter is not None and old_parameter["apply_type"] != "static":
+                parameter["ApplyMethod"] = "immediate"
+            else:
+                parameter["ApplyMethod"] = "pending-reboot"
+            changes.append(parameter)
+        for start in range(0, len(changes), MAX_PARAMETERS_PER_MODIFY):
+            self.aws_client.modify_db_parameter_group(
+                DBParameterGroupName=self.name,
+                Parameters=changes[start : start + MAX_PARAMETERS_PER_MODIFY],
+            )
+        self.logger.info('Parameter group "%s" modified: %s', self.name, ", ".join(parameters))
+
+        # Modified parameters are no longer engine defaults, so reading user parameters is enough
+        modified = self._fetch_properties(source="user")
+        for name in parameters:
+            if name in modified:
+                self._properties[name] = modified[name]
+            else:
+                self._properties.pop(name, None)
+
+    @contextmanager
+    def batch_edit(self) -> Iterator[dict[str, any]]:
+        """
+        Collects parameter changes and applies them together when the block exits without an error::
+
+            with parameter_group.batch_edit() as changes:
+                changes["wal_sender_timeout"] = 0
+        """
+        changes: dict[str, any] = {}
+        yield changes
+        self.set_parameters(changes)
 
     def delete(self) -> None:
         self.logger.info('Deleting parameter group "%s" ...', self.name)
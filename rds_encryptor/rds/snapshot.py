@@ -1,11 +1,10 @@
-import time
-from datetime import UTC, datetime, timedelta
 from typing import TYPE_CHECKING, Optional
 
-import boto3
 from botocore.exceptions import ClientError
 
+from rds_encryptor.aws import DescribeCache, LazyClient
 from rds_encryptor.utils import get_logger
+from rds_encryptor.waiter import Waiter
 
 if TYPE_CHECKING:
     from rds_encryptor.rds.instance import RDSInstance
@@ -13,7 +12,7 @@ if TYPE_CHECKING:
 
 class RDSSnapshot:
     logger = get_logger("RDSSnapshot")
-    aws_client = boto3.client("rds")
+    aws_client = LazyClient("rds")
 
     def __init__(self, snapshot_id: str, arn: str, tags: list[dict] = None):  # noqa: RUF013
         self.snapshot_id = snapshot_id
@@ -33,9 +32,9 @@ class RDSSnapshot:
         assert snapshot_id, "Snapshot ID is required"
 
         try:
-            snapshots = cls.aws_client.describe_db_snapshots(
-                DBSnapshotIdentifier=snapshot_id,
-            )["DBSnapshots"]
+            snapshots = DescribeCache.describe("rds", "describe_db_snapshots", DBSnapshotIdentifier=snapshot_id)[
+                "DBSnapshots"
+            ]
         except ClientError as e:
             if e.response["Error"]["Code"] == "DBSnapshotNotFound":
                 return None
@@ -76,18 +75,22 @@ class RDSSnapshot:
 
     def wait_until_created(self, timeout: int = 60 * 60, pooling_frequency: int = 60) -> "RDSSnapshot":
         self.logger.info('Waiting for snapshot "%s" to become available ...', self.snapshot_id)
-        timeout_dt = datetime.now(tz=UTC) + timedelta(seconds=timeout)
 
-        while datetime.now(tz=UTC) < timeout_dt:
+        def poll() -> tuple[bool, str]:
             status = self.get_status()
-            if status == "available":
-                self.logger.info('Snapshot "%s" is available', self.snapshot_id)
-                return self
             if status == "failed":
                 raise ValueError(f"Snapshot {self.snapshot_id} creation failed")
-            time.sleep(pooling_frequency)
-
-        raise TimeoutError(f"Snapshot {self.snapshot_id} creation timeout after {timeout} seconds")
+            return status == "available", status
+
+        Waiter.wait(
+            kind="rds-snapshot-available",
+            name=self.snapshot_id,
+            poll=poll,
+            timeout=timeout,
+            interval=pooling_frequency,
+        )
+        self.logger.info('Snapshot "%s" is available', self.snapshot_id)
+        return self
 
     def restore_snapshot(
         self,
@@ -29,3 +29,11 @@ def normalize_aws_id(db_name: str) -> str:
     They can't end with a hyphen, or contain two consecutive hyphens.
     """
     return "".join(c for c in db_name.replace("_", "-") if c.isalnum() or c == "-").strip("-")
+
+
+def get_replication_slot_name(database: str) -> str:
+    """
+    Slot names may contain only lower case letters, numbers and underscores, and are limited to 63 characters.
+    """
+    name = f"rds_encryptor_{database}_{MIGRATION_SEED}".lower()
+    return "".join(c if c.isascii() and c.isalnum() else "_" for c in name)[:63]
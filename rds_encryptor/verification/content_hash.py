@@ -0,0 +1,258 @@
+import datetime as dt
+import json
+import time
+from collections.abc import Callable, Iterable
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed, wait
+from decimal import Decimal
+from pathlib import Path
+from threading import Lock
+from typing import Any, Literal, NamedTuple
+from uuid import UUID
+
+from rds_encryptor.db_manager import DBManager, PostgresDBManager
+from rds_encryptor.rds.instance import RDSInstance
+from rds_encryptor.utils import get_logger
+
+
+class ChunkMismatch(NamedTuple):
+    database: str
+    table: str
+    lower: list | None
+    upper: list | None
+    keys: list[list]
+
+
+# Key values JSON cannot hold, saved as {"$type": name, "value": encoded} and restored on resume,
+# so resumed runs bind the same values and types as fresh ones. datetime precedes its base class date.
+_KEY_TYPES: dict[str, tuple[type, Callable[[Any], Any], Callable[[Any], Any]]] = {
+    "decimal": (Decimal, str, Decimal),
+    "uuid": (UUID, str, UUID),
+    "datetime": (dt.datetime, dt.datetime.isoformat, dt.datetime.fromisoformat),
+    "date": (dt.date, dt.date.isoformat, dt.date.fromisoformat),
+    "time": (dt.time, dt.time.isoformat, dt.time.fromisoformat),
+    "timedelta": (
+        dt.timedelta,
+        lambda value: [value.days, value.seconds, value.microseconds],
+        lambda value: dt.timedelta(*value),
+    ),
+    "bytes": (bytes, bytes.hex, bytes.fromhex),
+}
+
+
+def _encode_key_value(value: Any) -> dict:
+    for name, (value_type, encode, _) in _KEY_TYPES.items():
+        if isinstance(value, value_type):
+            return {"$type": name, "value": encode(value)}
+    raise TypeError(f"Cannot save key value of type {type(value).__name__}")
+
+
+def _decode_key_value(obj: dict) -> Any:
+    if "$type" not in obj:
+        return obj
+    _, _, decode = _KEY_TYPES[obj["$type"]]
+    return decode(obj["value"])
+
+
+def _to_keys(rows: Iterable[tuple]) -> list[list]:
+    """Keys as lists, with bytea values as bytes instead of memoryview, so they can be sorted and saved."""
+    return [[bytes(value) if isinstance(value, memoryview) else value for value in row] for row in rows]
+
+
+class ContentHashVerifier:
+    """
+    Compares table contents between source and target instances without DMS validation.
+
+    Every table with a primary key is split into chunks of ``chunk_rows`` rows by primary key range.
+    Each chunk is hashed (md5 of ordered row hashes) on both instances at the same time, and only chunks
+    with different hashes are split further, down to ``min_chunk_rows``, where single rows are compared.
+    Finished chunks are saved to ``progress_path`` so an interrupted run resumes where it stopped.
+    """
+
+    logger = get_logger("ContentHashVerifier")
+
+    def __init__(
+        self,
+        source_instance: RDSInstance,
+        target_instance: RDSInstance,
+        databases: list[str],
+        chunk_rows: int = 100_000,
+        min_chunk_rows: int = 1_000,
+        max_workers: int = 8,
+        progress_path: str | None = None,
+        save_interval: float = 5,
+    ):
+        self.source_instance = source_instance
+        self.target_instance = target_instance
+        self.databases = databases
+        self.chunk_rows = chunk_rows
+        self.min_chunk_rows = min_chunk_rows
+        self.max_workers = max_workers
+        self.progress_path = Path(progress_path) if progress_path else None
+        self.save_interval = save_interval
+        self._progress: dict[str, dict] = self._load_progress()
+        self._progress_lock = Lock()
+        self._saved_at = time.monotonic()
+
+    def _load_progress(self) -> dict[str, dict]:
+        if self.progress_path is None or not self.progress_path.exists():
+            return {}
+        progress = json.loads(self.progress_path.read_text(), object_hook=_decode_key_value)
+        self.logger.info('Resuming content verification from "%s" (%s tables)', self.progress_path, len(progress))
+        return progress
+
+    def _save_progress(self, force: bool = False) -> None:
+        if self.progress_path is None:
+            return
+        with self._progress_lock:
+            if not force and time.monotonic() - self._saved_at < self.save_interval:
+                return
+            tmp_path = self.progress_path.with_suffix(f"{self.progress_path.suffix}.tmp")
+            tmp_path.write_text(json.dumps(self._progress, default=_encode_key_value))
+            tmp_path.replace(self.progress_path)
+            self._saved_at = time.monotonic()
+
+    def _db_manager(self, database: str, side: Literal["source", "target"]) -> PostgresDBManager:
+        rds_instance = self.source_instance if side == "source" else self.target_instance
+        return DBManager.from_rds(rds_instance=rds_instance, database=database)
+
+    def _list_tables(self, database: str) -> list[tuple[int, str, str, list[str]]]:
+        catalog = self._db_manager(database, "source").catalog
+        tables = []
+        for table in catalog.user_tables:
+            # Partitioned tables are verified through their partitions
+            if table.is_partitioned:
+                continue
+            if not table.primary_key:
+                self.logger.warning(
+                    'Skip content verification of "%s" table in "%s": no primary key', table.qualified_name, database
+                )
+                continue
+            tables.append((table.size_bytes, database, table.qualified_name, list(table.primary_key)))
+        return tables
+
+    def _prepare_table(self, database: str, table: str, key_columns: list[str]) -> dict:
+        progress_key = f"{database}/{table}"
+        with self._progress_lock:
+            state = self._progress.get(progress_key)
+        if state is not None and state["key_columns"] == key_columns:
+            return state
+
+        boundaries = self._db_manager(database, "source").get_key_boundaries(table, key_columns, self.chunk_rows)
+        state = {"key_columns": key_columns, "boundaries": _to_keys(boundaries), "done": [], "mismatches": []}
+        with self._progress_lock:
+            self._progress[progress_key] = state
+        self._save_progress()
+        return state
+
+    def _compare_range(
+        self,
+        side_executor: ThreadPoolExecutor,
+        database: str,
+        table: str,
+        key_columns: list[str],
+        lower: list | None,
+        upper: list | None,
+    ) -> list[ChunkMismatch]:
+        source = self._db_manager(database, "source")
+        target = self._db_manager(database, "target")
+
+        target_future = side_executor.submit(target.hash_range, table, key_columns, lower, upper)
+        source_rows, source_hash = source.hash_range(table, key_columns, lower, upper)
+        target_rows, target_hash = target_future.result()
+        if source_rows == target_rows and source_hash == target_hash:
+            return []
+
+        if source_rows > self.min_chunk_rows:
+            step = max(self.min_chunk_rows, source_rows // 10)
+            bounds = _to_keys(source.get_key_boundaries(table, key_columns, step, lower, upper))
+            ranges = zip([lower, *bounds], [*bounds, upper], strict=True)
+            return [
+                mismatch
+                for sub_lower, sub_upper in ranges
+                for mismatch in self._compare_range(side_executor, database, table, key_columns, sub_lower, sub_upper)
+            ]
+
+        target_future = side_executor.submit(target.hash_rows, table, key_columns, lower, upper)
+        source_row_hashes = source.hash_rows(table, key_columns, lower, upper)
+        target_row_hashes = target_future.result()
+        keys = sorted(
+            _to_keys(
+                key
+                for key in source_row_hashes.keys() | target_row_hashes.keys()
+                if source_row_hashes.get(key) != target_row_hashes.get(key)
+            )
+        )
+        return [ChunkMismatch(database=database, table=table, lower=lower, upper=upper, keys=keys)]
+
+    def _verify_chunk(
+        self,
+        side_executor: ThreadPoolExecutor,
+        database: str,
+        table: str,
+        state: dict,
+        chunk: int,
+    ) -> list[ChunkMismatch]:
+        bounds = state["boundaries"]
+        lower = bounds[chunk - 1] if chunk > 0 else None
+        upper = bounds[chunk] if chunk < len(bounds) else None
+        mismatches = self._compare_range(side_executor, database, table, state["key_columns"], lower, upper)
+        for mismatch in mismatches:
+            self.logger.error(
+                'Content mismatch in "%s" table of "%s" database for key range (%s, %s]: %s rows differ',
+                table,
+                database,
+                mismatch.lower,
+                mismatch.upper,
+                len(mismatch.keys),
+            )
+        with self._progress_lock:
+            state["done"].append(chunk)
+            state["mismatches"].extend(mismatch._asdict() for mismatch in mismatches)
+        self._save_progress()
+        return mismatches
+
+    def run(self) -> dict[str, list[ChunkMismatch]]:
+        """
+        :return: Mismatched key ranges grouped by database. Databases without mismatches map to an empty list.
+        """
+        started_at = time.monotonic()
+        report: dict[str, list[ChunkMismatch]] = {database: [] for database in self.databases}
+        # Every worker may hash chunks of the same database at once
+        PostgresDBManager.pool.ensure_size(self.max_workers)
+
+        with (
+            ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="content-hash") as executor,
+            ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="content-hash-target") as side_executor,
+        ):
+            tables = sorted(
+                (table for tables in executor.map(self._list_tables, self.databases) for table in tables),
+                reverse=True,
+            )
+            prepared: dict[Future, tuple[str, str]] = {
+                executor.submit(self._prepare_table, database, table, key_columns): (database, table)
+                for _, database, table, key_columns in tables
+            }
+
+            chunks: list[Future] = []
+            for future in as_completed(prepared):
+                database, table = prepared[future]
+                state = future.result()
+                report[database].extend(ChunkMismatch(**mismatch) for mismatch in state["mismatches"])
+                done = set(state["done"])
+                chunks.extend(
+                    executor.submit(self._verify_chunk, side_executor, database, table, state, chunk)
+                    for chunk in range(len(state["boundaries"]) + 1)
+                    if chunk not in done
+                )
+            self.logger.info(
+                "Comparing %s chunks of %s tables in %s databases ...", len(chunks), len(tables), len(self.databases)
+            )
+
+            wait(chunks)
+            for future in chunks:
+                for mismatch in future.result():
+                    report[mismatch.database].append(mismatch)
+
+        self._save_progress(force=True)
+        self.logger.info("Content verification finished in %.1fs", time.monotonic() - started_at)
+        return report
@@ -0,0 +1,191 @@
+import time
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from enum import StrEnum
+from typing import Literal, NamedTuple
+
+import psycopg2
+
+from rds_encryptor.connection_pool import PoolExhaustedException
+from rds_encryptor.db_manager import DBManager, PostgresDBManager, TableEstimate
+from rds_encryptor.rds.instance import RDSInstance
+from rds_encryptor.utils import get_logger
+
+
+class ConsistencyStatus(StrEnum):
+    ESTIMATED_MATCH = "estimated-match"
+    EXACT_MATCH = "exact-match"
+    MISMATCH = "mismatch"
+
+
+class TableConsistency(NamedTuple):
+    database: str
+    table: str
+    status: ConsistencyStatus
+    source_count: int | None
+    target_count: int | None
+
+
+class _CountJob(NamedTuple):
+    database: str
+    table: str
+    side: Literal["source", "target"]
+
+
+def estimates_match(
+    source: TableEstimate,
+    target: TableEstimate,
+    tolerance: float,
+    exact_below: int,
+) -> bool:
+    """
+    Estimates match when both are known, at least one of them is large enough to be worth skipping
+    the exact count, and they differ by no more than ``tolerance`` (a fraction of the larger one).
+    """
+    if source.rows is None or target.rows is None:
+        return False
+    largest = max(source.rows, target.rows)
+    if largest < exact_below:
+        return False
+    return abs(source.rows - target.rows) <= tolerance * largest
+
+
+class RowCountVerifier:
+    """
+    Compares row counts of every table between source and target instances in two tiers.
+
+    First, row estimates (``pg_class.reltuples`` and ``pg_stat_user_tables.n_live_tup``) are read for
+    every database with one catalog query per side. Tables whose estimates agree within ``tolerance``
+    are reported as ``estimated-match``. All other tables, or every table when ``exact`` is set, get an
+    exact ``COUNT(*)`` on both sides. Counts for both sides, all tables and all databases share one
+    bounded worker pool, are submitted largest table first, and every mismatch is reported through
+    ``on_mismatch`` as soon as both sides of the table are counted.
+    """
+
+    logger = get_logger("RowCountVerifier")
+
+    def __init__(
+        self,
+        source_instance: RDSInstance,
+        target_instance: RDSInstance,
+        databases: list[str],
+        max_workers: int = 8,
+        tolerance: float = 0.0,
+        exact: bool = False,
+        exact_below: int = 10_000,
+        on_mismatch: Callable[[TableConsistency], None] | None = None,
+    ):
+        self.source_instance = source_instance
+        self.target_instance = target_instance
+        self.databases = databases
+        self.max_workers = max_workers
+        self.tolerance = tolerance
+        self.exact = exact
+        self.exact_below = exact_below
+        self.on_mismatch = on_mismatch or self._log_mismatch
+
+    def _log_mismatch(self, result: TableConsistency) -> None:
+        self.logger.error(
+            'Data inconsistency for table "%s" in "%s" database between "%s" and "%s" instances: '
+            "source count=%s, target count=%s",
+            result.table,
+            result.database,
+            self.source_instance.instance_id,
+            self.target_instance.instance_id,
+            result.source_count,
+            result.target_count,
+        )
+
+    def _db_manager(self, database: str, side: Literal["source", "target"]) -> PostgresDBManager:
+        rds_instance = self.source_instance if side == "source" else self.target_instance
+        return DBManager.from_rds(rds_instance=rds_instance, database=database)
+
+    def _count(self, job: _CountJob) -> int:
+        return self._db_manager(job.database, job.side).count(job.table)
+
+    def _estimate(
+        self, executor: ThreadPoolExecutor
+    ) -> tuple[dict[str, list[TableConsistency]], list[tuple[int, str, str]]]:
+        """
+        :return: Tables matched by estimates grouped by database, and (size, database, table) of tables
+            that need an exact count, largest first.
+        """
+        futures = {
+            (database, side): executor.submit(self._db_manager(database, side).get_table_estimates)
+            for database in self.databases
+            for side in ("source", "target")
+        }
+        estimated: dict[str, list[TableConsistency]] = {database: [] for database in self.databases}
+        exact_jobs = []
+        for database in self.databases:
+            source_estimates = futures[(database, "source")].result()
+            target_estimates = futures[(database, "target")].result()
+            for table, source in source_estimates.items():
+                target = target_estimates.get(table, TableEstimate(reltuples=None, live_tuples=None, size_bytes=0))
+                if not self.exact and estimates_match(source, target, self.tolerance, self.exact_below):
+                    estimated[database].append(
+                        TableConsistency(
+                            database=database,
+                            table=table,
+                            status=ConsistencyStatus.ESTIMATED_MATCH,
+                            source_count=source.rows,
+                            target_count=target.rows,
+                        )
+                    )
+                else:
+                    exact_jobs.append((source.size_bytes, database, table))
+        return estimated, sorted(exact_jobs, reverse=True)
+
+    def run(self) -> dict[str, list[TableConsistency]]:
+        """
+        :return: Consistency status of every source table grouped by database.
+        """
+        started_at = time.monotonic()
+        counts: dict[tuple[str, str], dict[str, int | None]] = {}
+        # Every worker may count tables of the same database at once
+        PostgresDBManager.pool.ensure_size(self.max_workers)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="row-count") as executor:
+            report, tables = self._estimate(executor)
+            self.logger.info(
+                "Row estimates matched for %s tables in %.1fs, counting rows of %s tables with %s workers ...",
+                sum(len(results) for results in report.values()),
+                time.monotonic() - started_at,
+                len(tables),
+                self.max_workers,
+            )
+            futures: dict[Future, _CountJob] = {}
+            for _, database, table in tables:
+                for side in ("source", "target"):
+                    job = _CountJob(database=database, table=table, side=side)
+                    futures[executor.submit(self._count, job)] = job
+
+            for future in as_completed(futures):
+                job = futures[future]
+                try:
+                    count = future.result()
+                except (psycopg2.Error, PoolExhaustedException) as e:
+                    self.logger.error(
+                        'Cannot count rows of "%s" table in %s "%s" database: %s', job.table, job.side, job.database, e
+                    )
+                    count = None
+                table_counts = counts.setdefault((job.database, job.table), {})
+                table_counts[job.side] = count
+                if len(table_counts) < 2:
+                    continue
+
+                source_count, target_count = table_counts["source"], table_counts["target"]
+                is_match = source_count is not None and source_count == target_count
+                result = TableConsistency(
+                    database=job.database,
+                    table=job.table,
+                    status=ConsistencyStatus.EXACT_MATCH if is_match else ConsistencyStatus.MISMATCH,
+                    source_count=source_count,
+                    target_count=target_count,
+                )
+                report[job.database].append(result)
+                if not is_match:
+                    self.on_mismatch(result)
+
+        self.logger.info("Row count verification finished in %.1fs", time.monotonic() - started_at)
+        return report
@@ -0,0 +1,122 @@
+import random
+import statistics
+import time
+from collections import defaultdict
+from collections.abc import Callable
+from threading import Lock
+
+from rds_encryptor.utils import get_logger
+
+# (is ready, current state) of the resource being waited for
+PollResult = tuple[bool, str]
+
+# Pause between polls right after the state changed, in seconds
+MIN_INTERVAL = 5
+
+
+class AdaptiveBackoff:
+    """
+    Poll intervals that start at ``min_interval`` and grow by ``multiplier`` up to ``max_interval``,
+    with +/- ``jitter`` randomization so concurrent waiters do not poll in lockstep.
+    """
+
+    def __init__(self, min_interval: float, max_interval: float, multiplier: float = 1.5, jitter: float = 0.2):
+        self.min_interval = min(min_interval, max_interval)
+        self.max_interval = max_interval
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self._interval = self.min_interval
+
+    def reset(self) -> None:
+        self._interval = self.min_interval
+
+    def next_interval(self) -> float:
+        interval = self._interval
+        self._interval = min(self._interval * self.multiplier, self.max_interval)
+        return interval * random.uniform(1 - self.jitter, 1 + self.jitter)  # noqa: S311
+
+
+class Waiter:
+    """
+    Waits for AWS resources with adaptive poll intervals.
+
+    Polling is frequent right after the resource changes state and backs off exponentially while it
+    stays the same. Durations of finished waits are remembered per ``kind``, and sleeps are cut short
+    when the transition is expected soon. Every wait logs how much time it spent on the critical path
+    and how late the transition could have been noticed.
+    """
+
+    logger = get_logger("Waiter")
+    _history: dict[str, list[float]] = defaultdict(list)
+    _history_lock = Lock()
+
+    @classmethod
+    def expected_duration(cls, kind: str) -> float | None:
+        with cls._history_lock:
+            history = cls._history.get(kind)
+            return statistics.median(history) if history else None
+
+    @classmethod
+    def _remember(cls, kind: str, duration: float) -> None:
+        with cls._history_lock:
+            cls._history[kind].append(duration)
+
+    @classmethod
+    def wait(
+        cls,
+        kind: str,
+        name: str,
+        poll: Callable[[], PollResult],
+        timeout: float,
+        interval: float,
+        min_interval: float = MIN_INTERVAL,
+        expected_duration: float | None = None,
+    ) -> float:
+        """
+        :param kind: Kind of transition, e.g. "rds-instance-available", used to learn expected durations
+        :param name: Resource name used in log messages
+        :param poll: Returns (is ready, current state), may raise to abort the wait
+        :param timeout: Timeout in seconds
+        :param interval: Longest pause between two polls in seconds, reached while the state stays the same
+        :param min_interval: Pause between polls right after a state change in seconds
+        :param expected_duration: Expected wait in seconds, defaults to the median of previous waits of this kind
+        :return: Time spent waiting in seconds
+        :raise TimeoutError: If the resource is not ready after ``timeout`` seconds
+        """
+        backoff = AdaptiveBackoff(min_interval=min_interval, max_interval=interval)
+        expected_duration = expected_duration or cls.expected_duration(kind)
+        started_at = time.monotonic()
+        deadline = started_at + timeout
+        last_state, last_sleep, polls = None, 0.0, 0
+
+        while True:
+            ready, state = poll()
+            polls += 1
+            elapsed = time.monotonic() - started_at
+            if ready:
+                cls._remember(kind, elapsed)
+                cls.logger.info(
+                    '%s "%s" is %s after %.0fs on the critical path (%s polls, noticed up to %.0fs late)',
+                    kind,
+                    name,
+                    state,
+                    elapsed,
+                    polls,
+                    last_sleep,
+                )
+                return elapsed
+            if state != last_state:
+                backoff.reset()
+                last_state = state
+
+            pause = backoff.next_interval()
+            if expected_duration is not None and elapsed < expected_duration < elapsed + pause:
+                # Wake up right when the transition is expected, then poll often again
+                pause = max(expected_duration - elapsed, min_interval)
+                backoff.reset()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"{kind} {name} is not ready after {timeout} seconds, last state: {state}")
+            last_sleep = min(pause, remaining)
+            cls.logger.debug('%s "%s" is %s, next poll in %.0fs', kind, name, state, last_sleep)
+            time.sleep(last_sleep)